@@ -0,0 +1,228 @@
+# Spending analytics for /api/analytics/*. A user's expenses are loaded once into
+# columnar numpy arrays (ExpenseColumns) and every statistic below is computed with
+# whole-array operations: per-category work is done on category-sorted arrays with
+# offset arithmetic rather than by looping over rows. Amounts stay int64 cents until
+# the results are converted to currency units at the edge.
+from datetime import date, timedelta
+from typing import List, Sequence
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_number(day: date) -> int:
+    """Days since 1970-01-01, the unit of ExpenseColumns.days."""
+    return day.toordinal() - EPOCH_ORDINAL
+
+
+def month_number(day: date) -> int:
+    """Months since 1970-01, the unit of ExpenseColumns.months()."""
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def amount(cents) -> float:
+    """Cents (any numpy scalar or int) to a plain float in currency units."""
+    return round(float(cents) / 100, 2)
+
+
+def text(value) -> str:
+    # ids are str when loaded from Mongo and fixed-width bytes when taken from the expense cache
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def month_label(number: int) -> str:
+    return f"{1970 + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class ExpenseColumns:
+    """One user's expenses as parallel arrays: id, day number, int64 cents and category code."""
+
+    def __init__(self, ids: np.ndarray, days: np.ndarray, cents: np.ndarray, codes: np.ndarray, categories: List[str]):
+        self.ids = ids
+        self.days = days
+        self.cents = cents
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_lists(cls, ids: Sequence[str], days: Sequence[int], cents: Sequence[int], categories: Sequence[str]):
+        # A dict lookup per row factorizes a handful of distinct names much faster than
+        # np.unique, which would sort a million strings
+        index = {}
+        codes = np.fromiter((index.setdefault(name, len(index)) for name in categories), np.int32, len(categories))
+        return cls(
+            np.asarray(ids, dtype=object),
+            np.asarray(days, dtype=np.int32),
+            np.asarray(cents, dtype=np.int64),
+            codes,
+            list(index),
+        )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def months(self) -> np.ndarray:
+        return self.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+
+
+def group_quantiles(values: np.ndarray, codes: np.ndarray, groups: int, qs: Sequence[float]) -> np.ndarray:
+    """Per-group quantiles (numpy's default linear interpolation) as a (groups, len(qs)) array.
+
+    Sorting by (code, value) lays every group out contiguously, so each quantile is an
+    interpolation between two offsets into the sorted array. Empty groups give NaN.
+    """
+    if len(values) == 0:
+        return np.full((groups, len(qs)), np.nan)
+    order = np.lexsort((values, codes))
+    ordered = values[order].astype(np.float64)
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    position = starts[:, None] + np.maximum(counts - 1, 0)[:, None] * np.asarray(qs, dtype=np.float64)[None, :]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    lower = np.minimum(lower, len(ordered) - 1)
+    upper = np.minimum(upper, len(ordered) - 1)
+    result = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    result[counts == 0] = np.nan
+    return result
+
+
+def daily_totals(columns: ExpenseColumns, first: int, last: int) -> np.ndarray:
+    """Spend in cents for each day number first..last inclusive."""
+    in_range = (columns.days >= first) & (columns.days <= last)
+    return np.bincount(
+        columns.days[in_range] - first,
+        weights=columns.cents[in_range],
+        minlength=last - first + 1,
+    )
+
+
+PERCENTILES = (25, 50, 75, 90, 99)
+
+
+def category_percentiles(columns: ExpenseColumns) -> dict:
+    groups = len(columns.categories)
+    counts = np.bincount(columns.codes, minlength=groups)
+    totals = np.bincount(columns.codes, weights=columns.cents, minlength=groups)
+    quantiles = group_quantiles(columns.cents, columns.codes, groups, [p / 100 for p in PERCENTILES])
+    return {
+        name: {
+            "count": int(counts[i]),
+            "total": amount(totals[i]),
+            **{f"p{p}": amount(quantiles[i, j]) for j, p in enumerate(PERCENTILES)},
+        }
+        for i, name in enumerate(columns.categories)
+        if counts[i]
+    }
+
+
+def rolling_averages(columns: ExpenseColumns, today: date, span: int = 90, windows: Sequence[int] = (30, 90)) -> dict:
+    """Trailing average daily spend over each window, for each of the last `span` days."""
+    last = day_number(today)
+    first = last - span - max(windows) + 2
+    cumulative = np.concatenate(([0.0], np.cumsum(daily_totals(columns, first, last))))
+    result = {"dates": [(today - timedelta(days=span - 1 - i)).isoformat() for i in range(span)]}
+    for window in windows:
+        sums = cumulative[window:] - cumulative[:-window]
+        result[f"rolling_{window}"] = np.round(sums[-span:] / window / 100, 2).tolist()
+    return result
+
+
+def month_over_month(columns: ExpenseColumns, today: date, months: int = 12) -> dict:
+    """Monthly totals with deltas against the previous month, overall and per category."""
+    current = month_number(today)
+    first = current - months  # one extra month so the oldest shown month has a delta
+    offsets = columns.months() - first
+    in_range = (offsets >= 0) & (offsets <= months)
+    groups = len(columns.categories)
+    # (category, month) totals in one bincount over a flattened index
+    grid = np.bincount(
+        columns.codes[in_range] * (months + 1) + offsets[in_range],
+        weights=columns.cents[in_range],
+        minlength=groups * (months + 1),
+    ).reshape(groups, months + 1)
+    totals = grid.sum(axis=0)
+    deltas = np.diff(totals)
+
+    def pct(delta, previous):
+        return round(float(delta / previous) * 100, 1) if previous else None
+
+    return {
+        "months": [
+            {
+                "month": month_label(first + i + 1),
+                "total": amount(totals[i + 1]),
+                "delta": amount(deltas[i]),
+                "delta_pct": pct(deltas[i], totals[i]),
+            }
+            for i in range(months)
+        ],
+        "by_category": {
+            name: {
+                "current": amount(grid[i, -1]),
+                "previous": amount(grid[i, -2]),
+                "delta": amount(grid[i, -1] - grid[i, -2]),
+                "delta_pct": pct(grid[i, -1] - grid[i, -2], grid[i, -2]),
+            }
+            for i, name in enumerate(columns.categories)
+            if grid[i, -1] or grid[i, -2]
+        },
+    }
+
+
+OUTLIER_MIN_GROUP = 8
+
+
+def outliers(columns: ExpenseColumns, threshold: float = 3.5, limit: int = 20) -> List[dict]:
+    """Unusually large expenses by robust z-score (median/MAD) within their category."""
+    groups = len(columns.categories)
+    if len(columns) == 0:
+        return []
+    counts = np.bincount(columns.codes, minlength=groups)
+    median = group_quantiles(columns.cents, columns.codes, groups, [0.5])[:, 0]
+    deviation = np.abs(columns.cents - median[columns.codes])
+    mad = group_quantiles(deviation, columns.codes, groups, [0.5])[:, 0]
+    # Categories with mostly identical amounts have MAD 0; fall back to the mean
+    # absolute deviation (scaled to the same consistency) so one odd amount still stands out
+    mean_dev = np.bincount(columns.codes, weights=deviation, minlength=groups) / np.maximum(counts, 1)
+    scale = np.where(mad > 0, mad / 0.6745, mean_dev * 1.2533)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (columns.cents - median[columns.codes]) / scale[columns.codes]
+    flagged = np.flatnonzero(
+        (score > threshold) & np.isfinite(score) & (counts[columns.codes] >= OUTLIER_MIN_GROUP)
+    )
+    top = flagged[np.argsort(-score[flagged], kind="stable")[:limit]]
+    return [
+        {
+            "id": text(columns.ids[i]),
+            "date": str(columns.days[i].astype("datetime64[D]")),
+            "category": columns.categories[columns.codes[i]],
+            "amount": amount(columns.cents[i]),
+            "typical": amount(median[columns.codes[i]]),
+            "score": round(float(score[i]), 1),
+        }
+        for i in top
+    ]
+
+
+FORECAST_TRAILING_DAYS = 90
+
+
+def forecast(columns: ExpenseColumns, today: date) -> dict:
+    """Project this month's total: spend so far plus the trailing daily rate for the days left."""
+    month_start = today.replace(day=1)
+    next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    days_in_month = (next_month - month_start).days
+    last = day_number(today)
+    trailing = daily_totals(columns, last - FORECAST_TRAILING_DAYS + 1, last)
+    spent = trailing[-today.day:].sum()  # the window always covers the month so far
+    daily_rate = trailing.mean()
+    days_remaining = days_in_month - today.day
+    return {
+        "month": month_start.strftime("%Y-%m"),
+        "spent_to_date": amount(spent),
+        "daily_rate": amount(daily_rate),
+        "days_remaining": days_remaining,
+        "projected_total": amount(spent + daily_rate * days_remaining),
+    }
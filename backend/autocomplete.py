@@ -0,0 +1,91 @@
+# Per-user prefix indexes for /api/expenses/autocomplete over the category and payment
+# method values a user's expenses use. A user has tens of distinct values, so an index is
+# just their use counts plus the case-folded values in sorted order: a lookup bisects to
+# the prefix and ranks the matches by use. The expense write routes adjust the counts in
+# place instead of rebuilding, and indexes are evicted least recently used past max_users.
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+FIELDS = ("category", "payment_method")
+
+
+class PrefixIndex:
+    def __init__(self, counts: Optional[Dict[str, int]] = None):
+        self.counts: Dict[str, int] = {}
+        self.keys: List[tuple] = []  # sorted (value.casefold(), value)
+        for value, count in (counts or {}).items():
+            self.add(value, count)
+
+    def add(self, value: str, count: int = 1):
+        if not isinstance(value, str) or not value:
+            return
+        if value not in self.counts:
+            self.counts[value] = 0
+            insort(self.keys, (value.casefold(), value))
+        self.counts[value] += count
+        if self.counts[value] <= 0:
+            del self.counts[value]
+            self.keys.pop(bisect_left(self.keys, (value.casefold(), value)))
+
+    def complete(self, prefix: str, limit: int) -> List[dict]:
+        """Values starting with prefix (case-insensitive), most used first."""
+        prefix = prefix.casefold()
+        matches = []
+        for i in range(bisect_left(self.keys, (prefix, "")), len(self.keys)):
+            key, value = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            matches.append(value)
+        matches.sort(key=lambda value: (-self.counts[value], value.casefold()))
+        return [{"value": value, "count": self.counts[value]} for value in matches[:limit]]
+
+
+class AutocompleteIndexes:
+    """{field: PrefixIndex} per user, valid for the data_version they were built at.
+
+    Versioned like expense_cache.ExpenseTableCache: advance() follows this worker's own
+    bumps, and a skipped version means another writer got in, so the user is dropped.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users = OrderedDict()  # user_id -> (version, {field: PrefixIndex})
+
+    def get(self, user_id: str, version: int) -> Optional[Dict[str, PrefixIndex]]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return entry[1]
+
+    def put(self, user_id: str, version: int, indexes: Dict[str, PrefixIndex]):
+        self._users[user_id] = (version, indexes)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def apply(self, user_id: str, added: Iterable[dict] = (), removed: Iterable[dict] = ()):
+        """Count the field values of expense documents written or deleted."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return
+        for docs, sign in ((removed, -1), (added, 1)):
+            for doc in docs:
+                for field, index in entry[1].items():
+                    index.add(doc.get(field), sign)
+
+    def advance(self, user_id: str, version: int):
+        entry = self._users.get(user_id)
+        if entry is None:
+            return
+        if entry[0] == version - 1:
+            self._users[user_id] = (version, entry[1])
+        else:
+            del self._users[user_id]
+
+    def drop(self, user_id: str):
+        self._users.pop(user_id, None)
@@ -0,0 +1,125 @@
+# Per-user change feed behind GET /api/changes (Server-Sent Events). Changes are published
+# by the write routes or by a MongoDB change stream (see server.py) as (event_id, event)
+# pairs. Each open stream reads from its own bounded queue, and the most recent events of
+# each user are kept so a reconnecting client can resume after its Last-Event-ID. A
+# client that can't resume, or that stopped reading until its queue filled up, is sent
+# a reset event instead and refetches.
+import asyncio
+import itertools
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set
+
+READY = {"op": "ready"}
+RESET = {"op": "reset"}
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(queue_size)
+
+    def push(self, event_id: str, event: dict):
+        try:
+            self.queue.put_nowait((event_id, event))
+        except asyncio.QueueFull:
+            # A stalled client: drop what it hasn't read and make it refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((event_id, RESET))
+
+    async def get(self) -> tuple:
+        return await self.queue.get()
+
+
+class ChangeFeed:
+    def __init__(self, max_connections_per_user: int, history: int = 256, queue_size: int = 256,
+                 max_users: int = 10000):
+        self.max_connections_per_user = max_connections_per_user
+        self.queue_size = queue_size
+        self.history = history
+        self.max_users = max_users
+        # Locally numbered ids carry a per-process prefix so they can't collide with
+        # another worker's
+        self.prefix = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._recent = OrderedDict()  # user_id -> deque of (event_id, event)
+
+    def connections(self, user_id: str) -> int:
+        return len(self._subscribers.get(user_id, ()))
+
+    def total_connections(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """Open a stream. It starts with what was missed since last_event_id, a reset if
+        that can't be replayed, or for a new stream a ready event carrying the id to
+        resume from."""
+        if self.connections(user_id) >= self.max_connections_per_user:
+            raise TooManyConnections(user_id)
+        subscription = Subscription(user_id, self.queue_size)
+        missed = self._since(user_id, last_event_id) if last_event_id else None
+        if not last_event_id:
+            subscription.push(self._head(user_id), READY)
+        elif missed is None:
+            subscription.push(self._head(user_id), RESET)
+        else:
+            for event_id, event in missed:
+                subscription.push(event_id, event)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, event: dict, event_id: Optional[str] = None):
+        if event_id is None:
+            event_id = self._next_id()
+        self._remember(user_id, event_id, event)
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.push(event_id, event)
+
+    def reset_all(self):
+        """Send every open stream a reset, e.g. after the change stream lost its place."""
+        self._recent.clear()
+        for user_id, subscribers in self._subscribers.items():
+            event_id = self._head(user_id)
+            for subscription in subscribers:
+                subscription.push(event_id, RESET)
+
+    def _next_id(self) -> str:
+        return f"{self.prefix}-{next(self._sequence)}"
+
+    def _remember(self, user_id: str, event_id: str, event: dict):
+        recent = self._recent.get(user_id)
+        if recent is None:
+            recent = self._recent[user_id] = deque(maxlen=self.history)
+            while len(self._recent) > self.max_users:
+                self._recent.popitem(last=False)
+        self._recent.move_to_end(user_id)
+        recent.append((event_id, event))
+
+    def _head(self, user_id: str) -> str:
+        """Id of the user's latest event, recording a ready marker if there is none."""
+        recent = self._recent.get(user_id)
+        if recent:
+            return recent[-1][0]
+        event_id = self._next_id()
+        self._remember(user_id, event_id, READY)
+        return event_id
+
+    def _since(self, user_id: str, last_event_id: str) -> Optional[List[tuple]]:
+        recent = list(self._recent.get(user_id, ()))
+        for i, (event_id, _) in enumerate(recent):
+            if event_id == last_event_id:
+                return [entry for entry in recent[i + 1:] if entry[1] is not READY]
+        return None
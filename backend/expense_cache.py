@@ -0,0 +1,228 @@
+# Opt-in in-memory cache of hot users' expenses for the stats and export paths. Each
+# cached user is one ExpenseTable: parallel numpy arrays (fixed-width id bytes, day
+# number, int64 cents, int32 string codes) with category, payment method and notes
+# interned in a per-table string pool, so a row costs tens of bytes instead of the
+# ~1 KB of a decoded document dict. Tables are updated in place by the expense write
+# routes and evicted least recently used once the cache's byte budget is exceeded.
+import sys
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analytics import ExpenseColumns
+
+# (id, day number, cents, category, payment_method, notes)
+ExpenseRow = Tuple[str, int, int, str, str, str]
+
+# Rough per-string overhead of a pool entry beyond the str itself: list slot plus dict entry
+STRING_OVERHEAD = 100
+
+
+class StringPool:
+    """Interns strings as int32 codes."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes = {}
+        self.nbytes = 0
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self.nbytes += sys.getsizeof(value) + STRING_OVERHEAD
+        return code
+
+
+class ExpenseTable:
+    """One user's expenses as growable parallel arrays; rows are unordered."""
+
+    COLUMNS = ("ids", "days", "cents", "categories", "methods", "notes")
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.size = 0
+        self.ids = np.zeros(0, dtype="S36")
+        self.days = np.zeros(0, dtype=np.int32)
+        self.cents = np.zeros(0, dtype=np.int64)
+        self.categories = np.zeros(0, dtype=np.int32)
+        self.methods = np.zeros(0, dtype=np.int32)
+        self.notes = np.zeros(0, dtype=np.int32)
+        self.strings = StringPool()
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= len(self.days):
+            return
+        capacity = max(needed, len(self.days) * 2, 64)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, rows: Sequence[ExpenseRow]):
+        if not rows:
+            return
+        self._reserve(len(rows))
+        width = max(len(row[0]) for row in rows)
+        if width > self.ids.dtype.itemsize:
+            self.ids = self.ids.astype(f"S{width}")
+        code = self.strings.code
+        end = self.size + len(rows)
+        self.ids[self.size:end] = [row[0].encode() for row in rows]
+        self.days[self.size:end] = [row[1] for row in rows]
+        self.cents[self.size:end] = [row[2] for row in rows]
+        self.categories[self.size:end] = [code(row[3]) for row in rows]
+        self.methods[self.size:end] = [code(row[4]) for row in rows]
+        self.notes[self.size:end] = [code(row[5]) for row in rows]
+        self.size = end
+
+    def remove(self, expense_id: str) -> bool:
+        # A vectorized scan instead of an id -> row dict, which would cost more than the row
+        hits = np.flatnonzero(self.ids[:self.size] == expense_id.encode())
+        if not len(hits):
+            return False
+        row, last = hits[0], self.size - 1
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[row] = column[last]
+        self.size = last
+        return True
+
+    def select(self, first_day: Optional[int] = None, last_day: Optional[int] = None,
+               category: Optional[str] = None) -> np.ndarray:
+        """Row indices matching the export filters, in date order."""
+        days = self.days[:self.size]
+        mask = np.ones(self.size, dtype=bool)
+        if first_day is not None:
+            mask &= days >= first_day
+        if last_day is not None:
+            mask &= days <= last_day
+        if category is not None:
+            code = self.strings.codes.get(category)
+            if code is None:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self.categories[:self.size] == code
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(days[rows], kind="stable")]
+
+    def export_batches(self, rows: np.ndarray, batch_size: int) -> Iterator[List[dict]]:
+        """Export-shaped dicts (see EXPORT_FIELDS) for the given rows, batch_size at a time.
+
+        The selected columns are copied now, so the batches stay consistent even if the
+        table is written to while they are consumed; the string pool only ever grows.
+        """
+        dates = self.days[rows].astype("datetime64[D]").astype(str)
+        amounts = self.cents[rows] / 100
+        codes = (self.categories[rows], self.methods[rows], self.notes[rows])
+        return iter_export_batches(self.strings.values, dates, amounts, codes, batch_size)
+
+    def analytics_columns(self) -> ExpenseColumns:
+        """A copy for analytics, so later in-place writes can't change it mid-computation."""
+        size = self.size
+        codes = self.categories[:size]
+        # Re-code categories densely; the pool also holds payment methods and notes
+        used, dense = np.unique(codes, return_inverse=True)
+        return ExpenseColumns(
+            self.ids[:size].copy(),
+            self.days[:size].copy(),
+            self.cents[:size].copy(),
+            dense.astype(np.int32),
+            [self.strings.values[code] for code in used],
+        )
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS) + self.strings.nbytes
+
+
+def iter_export_batches(values, dates, amounts, codes, batch_size):
+    categories, methods, notes = codes
+    for start in range(0, len(dates), batch_size):
+        end = start + batch_size
+        yield [
+            {
+                "date": str(day),
+                "category": values[category],
+                "amount": float(amount),
+                "payment_method": values[method],
+                "notes": values[note],
+            }
+            for day, category, amount, method, note in zip(
+                dates[start:end], categories[start:end], amounts[start:end], methods[start:end], notes[start:end]
+            )
+        ]
+
+
+class ExpenseTableCache:
+    """Per-user ExpenseTables under one byte budget, evicted least recently used.
+
+    A table is valid for the user's data_version it was loaded (or last advanced) at.
+    advance() follows this worker's own bumps; a bump that skips a version means another
+    writer got in between, so the table is dropped and reloaded on next use.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._tables = OrderedDict()  # user_id -> ExpenseTable
+        self._sizes = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, user_id: str, version: int) -> Optional[ExpenseTable]:
+        table = self._tables.get(user_id)
+        if table is None:
+            return None
+        if table.version != version:
+            self.drop(user_id)
+            return None
+        self._tables.move_to_end(user_id)
+        return table
+
+    def put(self, user_id: str, table: ExpenseTable):
+        self.drop(user_id)
+        self._tables[user_id] = table
+        self.resize(user_id)
+
+    def peek(self, user_id: str) -> Optional[ExpenseTable]:
+        return self._tables.get(user_id)
+
+    def resize(self, user_id: str):
+        """Re-account a table after it changed in place, evicting others past the budget."""
+        table = self._tables.get(user_id)
+        if table is None:
+            return
+        self.size += table.nbytes() - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = table.nbytes()
+        if self._sizes[user_id] > self.max_bytes:
+            self.drop(user_id)
+            return
+        while self.size > self.max_bytes:
+            self.drop(next(iter(self._tables)))
+
+    def advance(self, user_id: str, version: int):
+        table = self._tables.get(user_id)
+        if table is None:
+            return
+        if table.version == version - 1:
+            table.version = version
+        else:
+            self.drop(user_id)
+
+    def drop(self, user_id: str):
+        if self._tables.pop(user_id, None) is not None:
+            self.size -= self._sizes.pop(user_id)
+
+    def stats(self) -> dict:
+        rows = sum(table.size for table in self._tables.values())
+        return {
+            "users": len(self._tables),
+            "rows": rows,
+            "bytes": self.size,
+            "bytes_per_row": round(self.size / rows, 1) if rows else None,
+        }
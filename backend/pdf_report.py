@@ -0,0 +1,52 @@
+# PDF rendering for /api/export/pdf. Kept apart from server.py so process-pool
+# workers only import reportlab, not the app, its Mongo client or its settings.
+# reportlab itself is imported on the first render, keeping it out of server start-up.
+import io
+from typing import List, Tuple
+
+
+def render_expense_report(username: str, rows: List[Tuple[str, str, float, str]]) -> bytes:
+    """Render (date, category, amount, payment_method) rows into a PDF and return its bytes."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # Title
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, f"Expense Report - {username}")
+
+    # Headers
+    y = height - 100
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(50, y, "Date")
+    p.drawString(150, y, "Category")
+    p.drawString(250, y, "Amount")
+    p.drawString(350, y, "Payment")
+
+    # Data
+    p.setFont("Helvetica", 9)
+    y -= 20
+
+    total = 0
+    for exp_date, category, amount, payment_method in rows:
+        if y < 50:
+            p.showPage()
+            y = height - 50
+            p.setFont("Helvetica", 9)
+
+        p.drawString(50, y, exp_date[:10])
+        p.drawString(150, y, category[:15])
+        p.drawString(250, y, f"${amount:.2f}")
+        p.drawString(350, y, payment_method[:15])
+        total += amount
+        y -= 15
+
+    # Total
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(250, y - 20, f"Total: ${total:.2f}")
+
+    p.save()
+    return buffer.getvalue()
@@ -0,0 +1,52 @@
+from pathlib import Path
+import sys
+import time
+from datetime import date
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import analytics  # noqa: E402
+
+# CPU cost of each /api/analytics statistic for one user with 10k, 100k and 1M expenses
+# spread over three years, plus building the columns from the lists the loader collects.
+# Times should grow roughly linearly (n log n where a sort is involved).
+SIZES = [10_000, 100_000, 1_000_000]
+ROUNDS = 3
+TODAY = date(2024, 6, 15)
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Healthcare', 'Education', 'Other']
+
+
+def make_lists(rows):
+    rng = np.random.default_rng(42)
+    days = analytics.day_number(TODAY) - rng.integers(0, 3 * 365, rows)
+    cents = np.round(rng.lognormal(7, 1, rows)).astype(np.int64)
+    categories = np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), rows)]
+    return [str(i) for i in range(rows)], days.tolist(), cents.tolist(), categories.tolist()
+
+
+def measure(fn, *args):
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+STATS = [
+    ('percentiles', analytics.category_percentiles, ()),
+    ('rolling 30/90', analytics.rolling_averages, (TODAY, 365)),
+    ('month over month', analytics.month_over_month, (TODAY, 36)),
+    ('outliers', analytics.outliers, ()),
+    ('forecast', analytics.forecast, (TODAY,)),
+]
+
+print(f"{'rows':>10}  {'build columns':>14}" + ''.join(f'  {label:>16}' for label, _, _ in STATS))
+for rows in SIZES:
+    lists = make_lists(rows)
+    build = measure(analytics.ExpenseColumns.from_lists, *lists)
+    columns = analytics.ExpenseColumns.from_lists(*lists)
+    times = [measure(fn, columns, *args) for _, fn, args in STATS]
+    print(f'{rows:>10}  {build * 1000:>11.1f} ms' + ''.join(f'  {t * 1000:>13.1f} ms' for t in times))
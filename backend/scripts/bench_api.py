@@ -0,0 +1,402 @@
+from pathlib import Path
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+import httpx
+
+# Load-test every /api route of a running server against a dataset seeded by
+# scripts/seed_dataset.py: each scenario issues --requests requests from --concurrency
+# concurrent workers as random seeded users, after a short warm-up, and reports
+# throughput and p50/p95/p99 latency. Results are saved as JSON; pass a previous run as
+# --compare to print the change per route and exit non-zero on regressions.
+#
+#   python scripts/bench_api.py --out before.json
+#   python scripts/bench_api.py --out after.json --compare before.json
+#
+# Write scenarios create their own documents and delete them again outside the timed
+# part, but they still bump data versions and so invalidate response caches; the read
+# scenarios run first for that reason. Export and registration scenarios are heavy
+# (PDF rendering, bcrypt) and run a tenth of the requests.
+parser = argparse.ArgumentParser(description='Benchmark the API against a seeded dataset.')
+parser.add_argument('--base-url', default='http://localhost:8000')
+parser.add_argument('--users', default='loadtest_users.json', help='written by seed_dataset.py')
+parser.add_argument('--concurrency', type=int, default=16)
+parser.add_argument('--requests', type=int, default=500, help='per scenario')
+parser.add_argument('--warmup', type=int, default=20, help='untimed requests per scenario')
+parser.add_argument('--only', action='append', default=[], help='run scenarios whose name contains this')
+parser.add_argument('--out', default='bench_api_results.json')
+parser.add_argument('--compare', help='previous results file to compare against')
+parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+parser.add_argument('--seed', type=int, default=1)
+args = parser.parse_args()
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def expense_body(notes='bench'):
+    return {
+        'category': random.choice(['Food', 'Transport', 'Shopping']),
+        'amount': round(random.uniform(1, 200), 2),
+        'date': TODAY.isoformat(),
+        'payment_method': 'Card',
+        'notes': notes,
+    }
+
+
+def import_body():
+    rows = ''.join(f'{TODAY.isoformat()},Food,{5 + i}.25,Card,bench import {uuid.uuid4()}\n' for i in range(20))
+    return {'file': ('bench.csv', 'date,category,amount,payment_method,notes\n' + rows, 'text/csv')}
+
+
+class Account:
+    def __init__(self, entry):
+        self.user_id = entry['user_id']
+        self.email = entry['email']
+        self.password = entry['password']
+        self.expenses = entry.get('expenses', 0)
+        self.headers = {'Authorization': f"Bearer {entry['token']}"}
+        self.expense_ids = None
+        self.export_job_id = None
+
+
+class Bench:
+    """Shared state for scenarios: the HTTP client, accounts and cleanup queue."""
+
+    def __init__(self, http, accounts):
+        self.http = http
+        self.accounts = accounts
+        # The skewed seed gives one user far more expenses than the rest; scenarios whose
+        # cost grows with a user's history also run against them
+        self.heavy = max(accounts, key=lambda account: account.expenses)
+        self.cleanup = []  # (account, path) deleted after the scenario, untimed
+        self.swept = set()  # accounts whose 'bench' expenses dated today are deleted after it
+
+    def account(self):
+        return random.choice(self.accounts)
+
+    async def request(self, method, path, account=None, **kwargs):
+        headers = account.headers if account else {}
+        return await self.http.request(method, path, headers=headers, **kwargs)
+
+    async def expense_id(self, account):
+        if account.expense_ids is None:
+            response = await self.request('GET', '/api/expenses', account, params={'limit': 50})
+            account.expense_ids = [e['id'] for e in response.json()] or [None]
+        return random.choice(account.expense_ids)
+
+    async def created(self, account, path, body):
+        response = await self.request('POST', path, account, json=body)
+        return response.json()['id'] if response.status_code == 200 else None
+
+    async def sweep(self, account):
+        # Bulk and import responses carry counts, not ids, so their rows are found again:
+        # they are dated today and so come first in the newest-first listing
+        params = {'date_from': TODAY.isoformat(), 'limit': 500}
+        while True:
+            response = await self.request('GET', '/api/expenses', account, params=params)
+            for expense in response.json():
+                if expense.get('notes', '').startswith('bench'):
+                    await self.request('DELETE', f"/api/expenses/{expense['id']}", account)
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                return
+            params['cursor'] = cursor
+
+    async def export_job(self, account):
+        if account.export_job_id is None:
+            response = await self.request('POST', '/api/export/jobs', account, json={'format': 'csv'})
+            if response.status_code == 202:
+                account.export_job_id = response.json()['id']
+            else:  # at the per-user limit; any job of theirs will do
+                jobs = (await self.request('GET', '/api/export/jobs', account)).json()
+                account.export_job_id = jobs[0]['id'] if jobs else 'none'
+        return account.export_job_id
+
+
+# Each scenario is (name, route, share, accepted statuses, fn). fn(bench, account)
+# prepares anything it needs untimed and returns a coroutine factory for the timed request.
+async def get(bench, account, path, **params):
+    return lambda: bench.request('GET', path, account, params=params or None)
+
+
+async def delete_after_create(bench, account, create_path, body, delete_prefix):
+    new_id = await bench.created(account, create_path, body)
+    return lambda: bench.request('DELETE', f'{delete_prefix}/{new_id}', account)
+
+
+async def create_then_cleanup(bench, account, path, body, delete_prefix):
+    async def run():
+        response = await bench.request('POST', path, account, json=body)
+        if response.status_code == 200 and delete_prefix:
+            bench.cleanup.append((account, f"{delete_prefix}/{response.json()['id']}"))
+        return response
+    return run
+
+
+async def bulk(bench, account):
+    bench.swept.add(account)
+    items = [expense_body('bench bulk') for _ in range(20)]
+    return lambda: bench.request('POST', '/api/expenses/bulk', account, json={'items': items})
+
+
+async def expense_by_id(bench, account, method):
+    expense_id = await bench.expense_id(account)
+    if method == 'PUT':
+        # Rewrites the seeded expense with its own category, so the dataset is unchanged
+        current = (await bench.request('GET', f'/api/expenses/{expense_id}', account)).json()
+        return lambda: bench.request('PUT', f'/api/expenses/{expense_id}', account,
+                                     json={'category': current.get('category', 'Food')})
+    return lambda: bench.request(method, f'/api/expenses/{expense_id}', account)
+
+
+async def login(bench, account):
+    return lambda: bench.request('POST', '/api/auth/login', json={'email': account.email, 'password': account.password})
+
+
+async def register(bench, account):
+    email = f'bench-{uuid.uuid4().hex[:12]}@example.com'
+    return lambda: bench.request('POST', '/api/auth/register',
+                                 json={'username': 'bench', 'email': email, 'password': 'password123'})
+
+
+async def logout(bench, account):
+    # Logging out revokes the token, so it gets a fresh one of its own first
+    response = await bench.request('POST', '/api/auth/login', json={'email': account.email, 'password': account.password})
+    token = response.json().get('access_token')
+    return lambda: bench.http.post('/api/auth/logout', headers={'Authorization': f'Bearer {token}'})
+
+
+async def import_csv(bench, account):
+    bench.swept.add(account)
+    return lambda: bench.request('POST', '/api/expenses/import', account, files=import_body())
+
+
+async def export_job_route(bench, account, suffix=''):
+    job_id = await bench.export_job(account)
+    return lambda: bench.request('GET', f'/api/export/jobs/{job_id}{suffix}', account)
+
+
+def this_month():
+    return TODAY.month, TODAY.year
+
+
+SCENARIOS = [
+    # Reads first: the write scenarios below invalidate the per-user response caches
+    ('auth/me', 'GET /api/auth/me', 1, (), lambda b, a: get(b, a, '/api/auth/me')),
+    ('expenses: first page', 'GET /api/expenses', 1, (), lambda b, a: get(b, a, '/api/expenses')),
+    ('expenses: filtered', 'GET /api/expenses', 1, (),
+     lambda b, a: get(b, a, '/api/expenses', category='Food', min_amount=20, limit=50)),
+    # Each seeded note is on about a tenth of a user's expenses, so for the heavy user
+    # this may exceed SEARCH_MAX_MATCHES; the 400 it then gets is the bounded worst case
+    ('expenses/search', 'GET /api/expenses/search', 1, (), lambda b, a: get(b, a, '/api/expenses/search', q='coffee')),
+    ('expenses/search: heavy user', 'GET /api/expenses/search', 1, (400,),
+     lambda b, a: get(b, b.heavy, '/api/expenses/search', q='coffee')),
+    ('expenses/autocomplete: heavy user', 'GET /api/expenses/autocomplete', 1, (),
+     lambda b, a: get(b, b.heavy, '/api/expenses/autocomplete', field='category', prefix='f')),
+    ('expenses/{id}', 'GET /api/expenses/{expense_id}', 1, (), lambda b, a: expense_by_id(b, a, 'GET')),
+    ('categories', 'GET /api/categories', 1, (), lambda b, a: get(b, a, '/api/categories')),
+    ('budget', 'GET /api/budget/{month}/{year}', 1, (404,),
+     lambda b, a: get(b, a, '/api/budget/{}/{}'.format(*this_month()))),
+    ('budget status', 'GET /api/budget/{month}/{year}/status', 1, (),
+     lambda b, a: get(b, a, '/api/budget/{}/{}/status'.format(*this_month()), months=6)),
+    ('recurring', 'GET /api/recurring', 1, (), lambda b, a: get(b, a, '/api/recurring')),
+    ('dashboard', 'GET /api/dashboard/stats', 1, (), lambda b, a: get(b, a, '/api/dashboard/stats')),
+    ('reports: monthly', 'GET /api/reports/timeseries', 1, (),
+     lambda b, a: get(b, a, '/api/reports/timeseries', interval='month', split_by='category')),
+    ('analytics/percentiles', 'GET /api/analytics/percentiles', 1, (), lambda b, a: get(b, a, '/api/analytics/percentiles')),
+    ('analytics/rolling', 'GET /api/analytics/rolling', 1, (), lambda b, a: get(b, a, '/api/analytics/rolling')),
+    ('analytics/monthly', 'GET /api/analytics/monthly', 1, (), lambda b, a: get(b, a, '/api/analytics/monthly')),
+    ('analytics/outliers', 'GET /api/analytics/outliers', 1, (), lambda b, a: get(b, a, '/api/analytics/outliers')),
+    ('analytics/forecast', 'GET /api/analytics/forecast', 1, (), lambda b, a: get(b, a, '/api/analytics/forecast')),
+    ('export/csv', 'GET /api/export/csv', 0.1, (), lambda b, a: get(b, a, '/api/export/csv')),
+    ('export/excel', 'GET /api/export/excel', 0.1, (), lambda b, a: get(b, a, '/api/export/excel')),
+    ('export/pdf', 'GET /api/export/pdf', 0.1, (), lambda b, a: get(b, a, '/api/export/pdf')),
+    ('export/jobs list', 'GET /api/export/jobs', 1, (), lambda b, a: get(b, a, '/api/export/jobs')),
+    ('export/jobs/{id}', 'GET /api/export/jobs/{job_id}', 1, (404,), lambda b, a: export_job_route(b, a)),
+    ('export/jobs/{id}/download', 'GET /api/export/jobs/{job_id}/download', 0.1, (404, 409, 410),
+     lambda b, a: export_job_route(b, a, '/download')),
+    # Writes
+    ('auth/login', 'POST /api/auth/login', 0.1, (), login),
+    ('auth/register', 'POST /api/auth/register', 0.1, (), register),
+    ('auth/logout', 'POST /api/auth/logout', 0.1, (), logout),
+    ('expenses: create', 'POST /api/expenses', 1, (),
+     lambda b, a: create_then_cleanup(b, a, '/api/expenses', expense_body(), '/api/expenses')),
+    ('expenses: bulk 20', 'POST /api/expenses/bulk', 0.2, (), bulk),
+    ('expenses: import 20', 'POST /api/expenses/import', 0.2, (), import_csv),
+    ('expenses: update', 'PUT /api/expenses/{expense_id}', 1, (), lambda b, a: expense_by_id(b, a, 'PUT')),
+    ('expenses: delete', 'DELETE /api/expenses/{expense_id}', 1, (),
+     lambda b, a: delete_after_create(b, a, '/api/expenses', expense_body(), '/api/expenses')),
+    ('categories: create', 'POST /api/categories', 1, (),
+     lambda b, a: create_then_cleanup(b, a, '/api/categories',
+                                      {'name': f'Bench {uuid.uuid4().hex[:8]}', 'icon': 'Tag', 'color': '#888888'},
+                                      '/api/categories')),
+    ('categories: delete', 'DELETE /api/categories/{category_id}', 1, (),
+     lambda b, a: delete_after_create(b, a, '/api/categories',
+                                      {'name': f'Bench {uuid.uuid4().hex[:8]}', 'icon': 'Tag', 'color': '#888888'},
+                                      '/api/categories')),
+    ('budget: upsert', 'POST /api/budget', 1, (),
+     lambda b, a: create_then_cleanup(b, a, '/api/budget', {'month': TODAY.month, 'year': TODAY.year, 'limit': 2500.0}, None)),
+    ('recurring: create', 'POST /api/recurring', 1, (),
+     lambda b, a: create_then_cleanup(b, a, '/api/recurring', {
+         'category': 'Bills', 'amount': 9.99, 'frequency': 'monthly', 'payment_method': 'Card',
+         'next_date': TODAY.replace(year=TODAY.year + 1).isoformat(),
+     }, '/api/recurring')),
+    ('recurring: delete', 'DELETE /api/recurring/{recurring_id}', 1, (),
+     lambda b, a: delete_after_create(b, a, '/api/recurring', {
+         'category': 'Bills', 'amount': 9.99, 'frequency': 'monthly', 'payment_method': 'Card',
+         'next_date': TODAY.replace(year=TODAY.year + 1).isoformat(),
+     }, '/api/recurring')),
+    ('export/jobs: create', 'POST /api/export/jobs', 0.1, (429,),
+     lambda b, a: create_then_cleanup(b, a, '/api/export/jobs', {'format': 'csv'}, None)),
+]
+
+
+async def run_scenario(bench, name, share, accepted, prepare):
+    total = max(int(args.requests * share), args.concurrency)
+    latencies, statuses = [], {}
+    remaining = {'warmup': min(args.warmup, total), 'timed': total}
+
+    async def worker():
+        while True:
+            phase = 'warmup' if remaining['warmup'] > 0 else 'timed'
+            if remaining[phase] <= 0:
+                return
+            remaining[phase] -= 1
+            send = await prepare(bench, bench.account())
+            started = time.perf_counter()
+            try:
+                response = await send()
+                status = response.status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - started
+            if phase == 'timed':
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    for account, path in bench.cleanup:
+        await bench.request('DELETE', path, account)
+    for account in bench.swept:
+        await bench.sweep(account)
+    bench.cleanup.clear()
+    bench.swept.clear()
+
+    ok = sum(n for status, n in statuses.items() if status.isdigit() and (int(status) < 400 or int(status) in accepted))
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2) if value is not None else None  # noqa: E731
+    return {
+        'requests': len(latencies),
+        'ok': ok,
+        'errors': len(latencies) - ok,
+        'statuses': statuses,
+        # Warm-up requests share the wall time, so this slightly understates throughput
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'latency_ms': {
+            'mean': ms(sum(ordered) / len(ordered)) if ordered else None,
+            'p50': ms(percentile(ordered, 0.50)),
+            'p95': ms(percentile(ordered, 0.95)),
+            'p99': ms(percentile(ordered, 0.99)),
+            'max': ms(ordered[-1]) if ordered else None,
+        },
+    }
+
+
+async def uncovered_routes(http):
+    spec = (await http.get('/openapi.json')).json()
+    routes = {f'{method.upper()} {path}' for path, methods in spec.get('paths', {}).items()
+              if path.startswith('/api/') and '/dev/' not in path for method in methods}
+    return sorted(routes - {route for _, route, _, _, _ in SCENARIOS})
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Print per-route changes; returns the names of routes that regressed."""
+    regressed = []
+    print(f"\n{'scenario':32} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'req/s':>17}")
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        cells, worse = [], False
+        for key in ('p50', 'p95', 'p99'):
+            old, new = before['latency_ms'][key], result['latency_ms'][key]
+            change = (new - old) / old if old else 0
+            worse |= key == 'p95' and change > args.threshold
+            cells.append(f'{old:7.1f} {new:7.1f} {change:+4.0%}' if old else f"{'-':>17}")
+        old, new = before['throughput_rps'], result['throughput_rps']
+        change = (new - old) / old if old else 0
+        worse |= change < -args.threshold or result['errors'] > before['errors']
+        cells.append(f'{old:7.0f} {new:7.0f} {change:+4.0%}' if old else f"{'-':>17}")
+        print(f"{name:32} {' '.join(cells)}{'  REGRESSED' if worse else ''}")
+        if worse:
+            regressed.append(name)
+    return regressed
+
+
+async def main():
+    random.seed(args.seed)
+    dataset = json.loads(Path(args.users).read_text())
+    accounts = [Account(entry) for entry in dataset['accounts']]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as http:
+        missing = await uncovered_routes(http)
+        if missing:
+            print('No scenario for:', ', '.join(missing))
+        bench = Bench(http, accounts)
+        results = {}
+        for name, route, share, accepted, prepare in SCENARIOS:
+            if args.only and not any(part in name for part in args.only):
+                continue
+            result = await run_scenario(bench, name, share, accepted, prepare)
+            results[name] = {'route': route, **result}
+            latency = result['latency_ms']
+            print(f"{name:32} {result['throughput_rps']:8.1f} req/s  p50 {latency['p50']:8.2f}  "
+                  f"p95 {latency['p95']:8.2f}  p99 {latency['p99']:8.2f} ms  errors {result['errors']}")
+
+    output = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'base_url': args.base_url,
+            'commit': git_commit(),
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'dataset': {key: dataset.get(key) for key in ('users', 'expenses', 'skew', 'seed')},
+        },
+        'scenarios': results,
+    }
+    Path(args.out).write_text(json.dumps(output, indent=1))
+    print('Results written to', args.out)
+
+    if args.compare:
+        regressed = compare(output, json.loads(Path(args.compare).read_text()))
+        if regressed:
+            print(f'{len(regressed)} scenario(s) regressed by more than {args.threshold:.0%}')
+            sys.exit(1)
+
+
+asyncio.run(main())
@@ -0,0 +1,100 @@
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+import jwt
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+
+# Normalized the same way as server.py so the token below verifies there
+SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production').strip().strip('"').strip("'")
+
+# Cold start of a backend worker: how long `import server` takes in a fresh interpreter,
+# and how long a newly spawned uvicorn worker takes to answer its first API request,
+# including startup (indexes, pool warm-up), along with that first request's latency
+# next to a warm one. Point --app-dir at another checkout's backend folder to compare:
+#
+#   git worktree add /tmp/before <commit> && cp .env /tmp/before/backend/
+#   python scripts/bench_cold_start.py --app-dir /tmp/before/backend
+#   python scripts/bench_cold_start.py
+parser = argparse.ArgumentParser(description='Measure import time and time to first request.')
+parser.add_argument('--app-dir', default=str(ROOT), help='backend folder holding server.py')
+parser.add_argument('--runs', type=int, default=5)
+parser.add_argument('--port', type=int, default=8799)
+parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for a worker to answer')
+args = parser.parse_args()
+
+IMPORT_PROBE = '''
+import sys, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+print(elapsed, ",".join(m for m in ("openpyxl", "reportlab", "numpy") if m in sys.modules))
+'''
+WARM_REQUESTS = 20
+
+token = jwt.encode({'sub': 'bench-cold-start', 'exp': datetime.now(timezone.utc) + timedelta(hours=1)},
+                   SECRET_KEY, algorithm='HS256')
+url = f'http://127.0.0.1:{args.port}/api/expenses?limit=1'
+headers = {'Authorization': f'Bearer {token}'}
+env = {**os.environ, 'RECURRING_SCHEDULER': 'false'}
+
+
+def measure_import():
+    out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=args.app_dir, env=env,
+                         capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]) * 1000, out[1] if len(out) > 1 else ''
+
+
+def measure_first_request():
+    """(ms from spawn to the first 200, first request ms, median warm request ms)"""
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(args.port), '--log-level', 'warning'],
+        cwd=args.app_dir, env=env,
+    )
+    try:
+        with httpx.Client(timeout=args.timeout) as http:
+            while True:
+                if worker.poll() is not None:
+                    sys.exit(f'Worker exited with code {worker.returncode}')
+                if time.perf_counter() - started > args.timeout:
+                    sys.exit('Worker did not answer in time')
+                sent = time.perf_counter()
+                try:
+                    response = http.get(url, headers=headers)
+                except httpx.TransportError:
+                    time.sleep(0.01)  # not listening yet
+                    continue
+                response.raise_for_status()
+                break
+            answered = time.perf_counter()
+            warm = []
+            for _ in range(WARM_REQUESTS):
+                request_started = time.perf_counter()
+                http.get(url, headers=headers).raise_for_status()
+                warm.append(time.perf_counter() - request_started)
+        return (answered - started) * 1000, (answered - sent) * 1000, statistics.median(warm) * 1000
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+imports, heavy = [], ''
+for _ in range(args.runs):
+    ms, heavy = measure_import()
+    imports.append(ms)
+print(f'import server            median {statistics.median(imports):7.1f} ms  '
+      f'(min {min(imports):.1f}; loaded at import: {heavy or "none of openpyxl, reportlab, numpy"})')
+
+starts = [measure_first_request() for _ in range(args.runs)]
+print(f'spawn -> first response  median {statistics.median(s[0] for s in starts):7.1f} ms')
+print(f'first request            median {statistics.median(s[1] for s in starts):7.1f} ms')
+print(f'warm request             median {statistics.median(s[2] for s in starts):7.1f} ms')
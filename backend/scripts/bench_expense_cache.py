@@ -0,0 +1,70 @@
+from pathlib import Path
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bson import Int64  # noqa: E402
+from expense_cache import ExpenseTable  # noqa: E402
+import analytics  # noqa: E402
+
+# Memory per row of one user's expenses held as the documents Motor returns (a list of
+# dicts) versus the columnar ExpenseTable the expense cache keeps.
+ROWS = 100_000
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Healthcare', 'Education', 'Other']
+METHODS = ['Cash', 'Card', 'UPI', 'Bank Transfer']
+NOTES = ['', 'lunch', 'groceries', 'monthly']
+
+
+def make_docs():
+    created_at = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": "bench-user",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "amount_cents": Int64(1250 + i % 5000),
+            "date": datetime(2024, i % 12 + 1, i % 28 + 1, tzinfo=timezone.utc),
+            "payment_method": METHODS[i % len(METHODS)],
+            "notes": NOTES[i % len(NOTES)] + (f" #{i}" if i % 10 == 0 else ""),
+            "receipt_url": "",
+            "created_at": created_at,
+        }
+        for i in range(ROWS)
+    ]
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, used
+
+
+def make_table(docs):
+    table = ExpenseTable()
+    table.append([
+        (
+            doc["id"],
+            doc["date"].date().toordinal() - analytics.EPOCH_ORDINAL,
+            int(doc["amount_cents"]),
+            doc["category"],
+            doc["payment_method"],
+            doc["notes"],
+        )
+        for doc in docs
+    ])
+    return table
+
+
+docs, dict_bytes = measure(make_docs)
+table, table_bytes = measure(lambda: make_table(docs))
+print(f"dicts:          {dict_bytes / ROWS:8.1f} bytes/row (tracemalloc)")
+print(f"ExpenseTable:   {table_bytes / ROWS:8.1f} bytes/row (tracemalloc), "
+      f"{table.nbytes() / ROWS:.1f} bytes/row as accounted by the cache")
+print(f"ratio:          {table_bytes / dict_bytes:8.1%} of the dict form")
@@ -0,0 +1,181 @@
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone
+import inspect
+import os
+import time
+import uuid
+import pymongo
+from pymongo import monitoring, ReturnDocument
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'expense_tracker_db')
+
+# Round trips and latency of the write routes' database work, before and after they
+# were reduced to single atomic commands: the old call sequences next to the new ones,
+# against a scratch database that is dropped afterwards.
+ITERATIONS = 200
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+client = pymongo.MongoClient(MONGO_URL, event_listeners=[counter])
+db = client[f'{DB_NAME}_bench_writes']
+client.drop_database(db.name)
+db.budgets.create_index([('user_id', 1), ('month', 1), ('year', 1)], unique=True)
+db.categories.create_index([('id', 1)], unique=True)
+db.expenses.create_index([('id', 1)], unique=True)
+
+USER_ID = 'bench-user'
+db.users.insert_one({'id': USER_ID, 'currency': 'USD'})
+CATEGORY_NAMES = ['Food', 'Transport', 'Bills', 'Shopping', 'Entertainment', 'Health', 'Other']
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def category_doc(name):
+    return {'id': str(uuid.uuid4()), 'user_id': USER_ID, 'name': name, 'icon': 'Tag', 'color': '#888888',
+            'is_custom': True, 'created_at': now()}
+
+
+# register: the default categories
+def register_before(i):
+    for name in CATEGORY_NAMES:
+        db.categories.insert_one(category_doc(name))
+
+
+def register_after(i):
+    db.categories.insert_many([category_doc(name) for name in CATEGORY_NAMES])
+
+
+# POST /budget: user lookup for the currency, then find, then update or insert
+def budget_before(i):
+    user = db.users.find_one({'id': USER_ID})
+    month, year = i % 12 + 1, 2000 + i // 12
+    existing = db.budgets.find_one({'user_id': USER_ID, 'month': month, 'year': year})
+    if existing:
+        db.budgets.update_one({'id': existing['id']}, {'$set': {'limit': 100.0, 'currency': user['currency']}})
+    else:
+        db.budgets.insert_one({'id': str(uuid.uuid4()), 'user_id': USER_ID, 'month': month, 'year': year,
+                               'limit': 100.0, 'currency': user['currency'], 'created_at': now()})
+
+
+def budget_after(i):
+    # The currency comes from the per-user version memo the server already keeps
+    month, year = i % 12 + 1, 2000 + i // 12
+    db.budgets.find_one_and_update(
+        {'user_id': USER_ID, 'month': month, 'year': year},
+        {'$set': {'limit': 100.0, 'currency': 'USD'}, '$inc': {'version': 1},
+         '$setOnInsert': {'id': str(uuid.uuid4()), 'created_at': now()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+# DELETE /categories/{id}: find to check ownership and is_custom, then delete
+def category_delete_before(i):
+    doc = category_doc('Custom')
+    db.categories.insert_one(doc)
+    yield
+    category = db.categories.find_one({'id': doc['id'], 'user_id': USER_ID})
+    if category and category.get('is_custom', True):
+        db.categories.delete_one({'id': doc['id']})
+
+
+def category_delete_after(i):
+    doc = category_doc('Custom')
+    db.categories.insert_one(doc)
+    yield
+    db.categories.find_one_and_delete({'id': doc['id'], 'user_id': USER_ID, 'is_custom': {'$ne': False}}, {'_id': 1})
+
+
+# PUT /expenses/{id}: find, update, re-read
+def expense_doc():
+    doc = {'id': str(uuid.uuid4()), 'user_id': USER_ID, 'category': 'Food', 'amount_cents': 1250,
+           'date': datetime(2024, 1, 2, tzinfo=timezone.utc), 'payment_method': 'Card', 'notes': '', 'version': 1}
+    db.expenses.insert_one(doc)
+    return doc
+
+
+def expense_update_before(i):
+    doc = expense_doc()
+    yield
+    if db.expenses.find_one({'id': doc['id'], 'user_id': USER_ID}):
+        db.expenses.update_one({'id': doc['id'], 'user_id': USER_ID}, {'$set': {'amount_cents': 1300}})
+        db.expenses.find_one({'id': doc['id'], 'user_id': USER_ID}, {'_id': 0})
+
+
+def expense_update_after(i):
+    doc = expense_doc()
+    yield
+    # The pre-image plus the applied fields give the response; version guards lost updates
+    db.expenses.find_one_and_update(
+        {'id': doc['id'], 'user_id': USER_ID, 'version': 1},
+        {'$set': {'amount_cents': 1300}, '$inc': {'version': 1}},
+        projection={'_id': 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+
+def measure(operation):
+    """Mean commands and milliseconds per call. Generator operations do untimed setup up
+    to their yield; only what follows it is measured."""
+    commands, elapsed = 0, 0.0
+    for i in range(ITERATIONS):
+        steps = operation(i) if inspect.isgeneratorfunction(operation) else None
+        if steps is not None:
+            next(steps)
+        before = counter.count
+        started = time.perf_counter()
+        if steps is not None:
+            next(steps, None)
+        else:
+            operation(i)
+        elapsed += time.perf_counter() - started
+        commands += counter.count - before
+    return commands / ITERATIONS, elapsed / ITERATIONS * 1000
+
+
+def report(label, before, after, setup=None):
+    cells = []
+    for operation in (before, after):
+        db.budgets.delete_many({})
+        if setup:
+            setup()
+        trips, ms = measure(operation)
+        cells.append(f'{trips:4.1f} trips {ms:7.3f} ms')
+    print(f'{label:32} {cells[0]:>22} {cells[1]:>22}')
+
+
+def existing_budgets():
+    for i in range(ITERATIONS):
+        budget_after(i)
+
+
+print(f"{'operation':32} {'before':>22} {'after':>22}")
+report('register: default categories', register_before, register_after)
+report('POST /budget (new month)', budget_before, budget_after)
+report('POST /budget (existing month)', budget_before, budget_after, setup=existing_budgets)
+report('DELETE /categories/{id}', category_delete_before, category_delete_after)
+report('PUT /expenses/{id}', expense_update_before, expense_update_after)
+
+client.drop_database(db.name)
+client.close()
@@ -0,0 +1,118 @@
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone
+import os
+import sys
+import pymongo
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+sys.path.insert(0, str(ROOT))
+
+from server import INDEX_MODELS, expense_query, keyset_condition, to_bson_date  # noqa: E402
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'expense_tracker_db')
+
+client = pymongo.MongoClient(MONGO_URL)
+db = client[DB_NAME]
+
+# Make sure the plans below are judged against the same indexes the server creates
+for collection, models in INDEX_MODELS.items():
+    db[collection].create_indexes(models)
+
+USER_ID = 'plan-check-user'
+DOC_ID = 'plan-check-id'
+
+# (label, collection, explain command body) for the query behind each route
+CHECKS = [
+    ('register/login: user by email', 'users', {'filter': {'email': 'plan-check@example.com'}}),
+    ('auth/me, budget: user by id', 'users', {'filter': {'id': USER_ID}}),
+    ('GET /expenses', 'expenses', {
+        'filter': {'user_id': USER_ID},
+        'sort': {'date': -1, 'id': -1},
+        'limit': 100,
+    }),
+    # Expense filters come from the server's own builders so the checks follow the
+    # storage format (BSON and legacy string dates, amount_cents and legacy amount)
+    ('GET /expenses: next page', 'expenses', {
+        'filter': {'user_id': USER_ID, **keyset_condition(to_bson_date('2024-06-01'), DOC_ID)},
+        'sort': {'date': -1, 'id': -1},
+        'limit': 100,
+    }),
+    ('GET /expenses: filtered', 'expenses', {
+        'filter': expense_query(USER_ID, '2024-01-01', '2024-12-31', 'Food', 'Cash', 1, 100),
+        'sort': {'date': -1, 'id': -1},
+        'limit': 100,
+    }),
+    ('GET/PUT/DELETE /expenses/{id}', 'expenses', {'filter': {'id': DOC_ID, 'user_id': USER_ID}}),
+    ('exports', 'expenses', {'filter': {'user_id': USER_ID}}),
+    ('GET /categories', 'categories', {'filter': {'user_id': USER_ID}}),
+    ('DELETE /categories/{id}', 'categories', {'filter': {'id': DOC_ID, 'user_id': USER_ID}}),
+    ('budget by month', 'budgets', {'filter': {'user_id': USER_ID, 'month': 1, 'year': 2024}}),
+    ('budget status: budgets in range', 'budgets', {'filter': {'user_id': USER_ID, '$or': [
+        {'month': 12, 'year': 2023}, {'month': 1, 'year': 2024},
+    ]}}),
+    ('GET /recurring', 'recurring_expenses', {'filter': {'user_id': USER_ID}}),
+    ('DELETE /recurring/{id}', 'recurring_expenses', {'filter': {'id': DOC_ID, 'user_id': USER_ID}}),
+    ('export job claim', 'export_jobs', {'filter': {'status': 'queued'}, 'sort': {'created_at': 1}}),
+    ('GET /export/jobs', 'export_jobs', {'filter': {'user_id': USER_ID}, 'sort': {'created_at': -1}}),
+    ('GET /export/jobs/{id}', 'export_jobs', {'filter': {'id': DOC_ID, 'user_id': USER_ID}}),
+    ('export file sweep', 'exports.files', {'filter': {'metadata.expires_at': {'$lt': datetime(2024, 1, 1, tzinfo=timezone.utc)}}}),
+    ('rollup upsert', 'expense_rollups', {'filter': {
+        'user_id': USER_ID, 'month': '2024-01', 'category': 'Food', 'payment_method': 'Cash',
+    }}),
+]
+
+AGGREGATE_CHECKS = [
+    ('GET /dashboard/stats', 'expense_rollups', [{'$match': {'user_id': USER_ID}}]),
+    ('GET /reports/timeseries', 'expenses', [
+        {'$match': expense_query(USER_ID, '2024-01-01', '2024-12-31')},
+    ]),
+    ('budget status: spending in range', 'expense_rollups', [
+        {'$match': {'user_id': USER_ID, 'month': {'$in': ['2023-12', '2024-01']}}},
+    ]),
+    ('GET /expenses/search', 'expenses', [
+        {'$match': {'user_id': USER_ID, '$text': {'$search': 'lunch'}}},
+        {'$addFields': {'score': {'$meta': 'textScore'}}},
+    ]),
+    ('GET /expenses/autocomplete', 'expense_rollups', [{'$match': {'user_id': USER_ID}}]),
+]
+
+
+def find_collscan(node):
+    """Return True if any winning-plan stage in an explain document is a COLLSCAN."""
+    if isinstance(node, dict):
+        if node.get('stage') == 'COLLSCAN':
+            return True
+        return any(find_collscan(v) for k, v in node.items() if k != 'rejectedPlans')
+    if isinstance(node, list):
+        return any(find_collscan(v) for v in node)
+    return False
+
+
+failures = []
+
+
+def report(label, plan):
+    scanned = find_collscan(plan)
+    if scanned:
+        failures.append(label)
+    print(('COLLSCAN ' if scanned else 'ok       ') + label)
+
+
+for label, collection, body in CHECKS:
+    report(label, db.command('explain', {'find': collection, **body}, verbosity='queryPlanner'))
+
+for label, collection, pipeline in AGGREGATE_CHECKS:
+    report(label, db.command(
+        'explain',
+        {'aggregate': collection, 'pipeline': pipeline, 'cursor': {}},
+        verbosity='queryPlanner',
+    ))
+
+client.close()
+
+if failures:
+    print(f'{len(failures)} route queries use a collection scan')
+    sys.exit(1)
@@ -0,0 +1,93 @@
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import date, datetime, timezone
+import os
+import pymongo
+from bson import Int64
+from pymongo import UpdateOne
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'expense_tracker_db')
+BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '1000'))
+MIGRATION_ID = 'expense_storage_v2'
+
+client = pymongo.MongoClient(MONGO_URL, tz_aware=True)
+db = client[DB_NAME]
+
+# Convert legacy expenses (ISO-string date/created_at, float amount) to the current
+# storage format (BSON dates, int64 amount_cents). The server reads both formats, so
+# this can run while the app is live. It walks the collection in _id order and records
+# its position in the migrations collection, so an interrupted run resumes where it
+# stopped. Each update only applies if the document still holds the fields it was
+# computed from, and the same version, so a document edited through the API in the
+# meantime is left for the next run instead of being overwritten.
+
+# A legacy document edited through PUT with an amount already has amount_cents but can
+# still hold string dates, so any of the three legacy fields selects a document.
+LEGACY = {'$or': [
+    {'amount_cents': {'$exists': False}},
+    {'date': {'$type': 'string'}},
+    {'created_at': {'$type': 'string'}},
+]}
+checkpoint = db.migrations.find_one({'_id': MIGRATION_ID}) or {}
+last_id = checkpoint.get('last_id')
+
+
+def to_bson_date(value):
+    day = date.fromisoformat(value[:10])
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+migrated = skipped = 0
+while True:
+    query = dict(LEGACY)
+    if last_id is not None:
+        query['_id'] = {'$gt': last_id}
+    batch = list(db.expenses.find(
+        query, {'_id': 1, 'date': 1, 'amount': 1, 'amount_cents': 1, 'created_at': 1, 'version': 1},
+    ).sort('_id', 1).limit(BATCH_SIZE))
+    if not batch:
+        break
+
+    ops = []
+    for doc in batch:
+        update = {}
+        try:
+            if isinstance(doc.get('date'), str):
+                update['date'] = to_bson_date(doc['date'])
+            if isinstance(doc.get('created_at'), str):
+                update['created_at'] = datetime.fromisoformat(doc['created_at'])
+            if 'amount_cents' not in doc:
+                update['amount_cents'] = Int64(round(doc['amount'] * 100))
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            print('Skipping expense with unreadable date or amount:', doc['_id'])
+            continue
+        # Documents written before versioning have no version field yet
+        version = doc['version'] if 'version' in doc else {'$exists': False}
+        guard = {'_id': doc['_id'], 'date': doc.get('date'), 'created_at': doc.get('created_at'), 'version': version}
+        change = {'$set': update}
+        if 'amount' in doc:
+            guard['amount'] = doc['amount']
+            change['$unset'] = {'amount': ''}
+        ops.append(UpdateOne(guard, change))
+    if ops:
+        migrated += db.expenses.bulk_write(ops, ordered=False).modified_count
+
+    last_id = batch[-1]['_id']
+    db.migrations.update_one({'_id': MIGRATION_ID}, {'$set': {'last_id': last_id}}, upsert=True)
+    print('Migrated', migrated, 'expenses so far')
+
+# The walk finished, so the next run starts from the beginning again and picks up
+# anything skipped or changed under this one
+remaining = db.expenses.count_documents(LEGACY)
+finished = {'$unset': {'last_id': ''}}
+if remaining == 0:
+    finished['$set'] = {'completed_at': datetime.now(timezone.utc)}
+db.migrations.update_one({'_id': MIGRATION_ID}, finished, upsert=True)
+print('Migrated', migrated, 'expenses,', skipped, 'skipped,', remaining, 'still in the legacy format')
+
+client.close()
@@ -0,0 +1,64 @@
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+import pymongo
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'expense_tracker_db')
+
+client = pymongo.MongoClient(MONGO_URL)
+db = client[DB_NAME]
+
+# Rebuild expense_rollups from scratch. The rollups are aggregated into a scratch
+# collection first and then swapped in with a rename, so the dashboard never reads a
+# half-built collection. Expense writes that land while this runs are not captured,
+# so run it with writes paused (e.g. during a deploy).
+staging = 'expense_rollups_rebuild'
+db[staging].drop()
+
+# Expenses may be in either storage format until scripts/migrate_expense_storage.py has
+# finished: BSON date + int64 amount_cents, or an ISO date string + float amount
+db.expenses.aggregate([
+    {'$group': {
+        '_id': {
+            'user_id': '$user_id',
+            'month': {'$cond': [  # YYYY-MM
+                {'$eq': [{'$type': '$date'}, 'date']},
+                {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                {'$substrBytes': ['$date', 0, 7]},
+            ]},
+            'category': '$category',
+            'payment_method': '$payment_method',
+        },
+        'total_cents': {'$sum': {'$ifNull': [
+            '$amount_cents',
+            {'$toLong': {'$round': [{'$multiply': ['$amount', 100]}, 0]}},
+        ]}},
+        'count': {'$sum': 1},
+    }},
+    {'$project': {
+        '_id': 0,
+        'user_id': '$_id.user_id',
+        'month': '$_id.month',
+        'category': '$_id.category',
+        'payment_method': '$_id.payment_method',
+        'total_cents': {'$toLong': '$total_cents'},
+        'count': 1,
+    }},
+    {'$out': staging},
+], allowDiskUse=True)
+
+# Upserts from the write routes rely on this key being unique
+db[staging].create_index(
+    [('user_id', 1), ('month', 1), ('category', 1), ('payment_method', 1)],
+    unique=True,
+    name='rollup_key',
+)
+rows = db[staging].count_documents({})
+db[staging].rename('expense_rollups', dropTarget=True)
+print('Rebuilt expense_rollups:', rows, 'rows')
+
+client.close()
@@ -0,0 +1,237 @@
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+import argparse
+import json
+import os
+import time
+import uuid
+import numpy as np
+import pymongo
+from bson import Int64
+from passlib.context import CryptContext
+import jwt
+
+ROOT = Path(__file__).parent.parent
+load_dotenv(ROOT / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'expense_tracker_db')
+# Normalized the same way as server.py so the tokens written below verify there
+SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production').strip().strip('"').strip("'")
+ALGORITHM = 'HS256'
+TOKEN_EXPIRE_DAYS = 7
+
+# Seed a local database with a synthetic load-test dataset: --users users whose expense
+# counts follow a Zipf-like distribution (a few heavy users, a long tail of light ones)
+# adding up to --expenses rows, written in the server's storage format with bulk
+# inserts, plus default categories, budgets, recurring items and expense_rollups. The
+# users and JWTs for them go to --out for scripts/bench_api.py. All seeded users share
+# the password below and an email starting with --prefix; re-running with the same
+# prefix replaces them.
+#
+#   python scripts/seed_dataset.py --users 1000 --expenses 2000000
+parser = argparse.ArgumentParser(description='Seed a synthetic load-test dataset.')
+parser.add_argument('--users', type=int, default=100)
+parser.add_argument('--expenses', type=int, default=100_000, help='total expenses across all users')
+parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent; 0 spreads expenses evenly')
+parser.add_argument('--years', type=int, default=3, help='history length, ending today')
+parser.add_argument('--prefix', default='loadtest')
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--batch', type=int, default=10_000)
+parser.add_argument('--out', default='loadtest_users.json')
+args = parser.parse_args()
+
+PASSWORD = 'password123'
+BATCH = args.batch
+CATEGORIES = [
+    # name, icon, color, share of expenses, typical amount
+    ('Food', 'Utensils', '#FF6B6B', 0.34, 18.0),
+    ('Transport', 'Car', '#4ECDC4', 0.18, 12.0),
+    ('Bills', 'FileText', '#45B7D1', 0.08, 95.0),
+    ('Shopping', 'ShoppingBag', '#FFA07A', 0.16, 45.0),
+    ('Entertainment', 'Music', '#DDA15E', 0.10, 30.0),
+    ('Health', 'Heart', '#BC6C25', 0.05, 60.0),
+    ('Other', 'MoreHorizontal', '#606C38', 0.09, 25.0),
+]
+METHODS = ['Card', 'Cash', 'UPI', 'Bank Transfer']
+METHOD_SHARES = [0.5, 0.2, 0.2, 0.1]
+NOTES = ['', '', '', 'lunch', 'groceries', 'coffee', 'taxi', 'monthly', 'gift', 'refund pending']
+
+client = pymongo.MongoClient(MONGO_URL)
+db = client[DB_NAME]
+rng = np.random.default_rng(args.seed)
+
+
+def drop_previous():
+    email_pattern = {'$regex': f'^{args.prefix}-[0-9]+@example\\.com$'}
+    user_ids = [u['id'] for u in db.users.find({'email': email_pattern}, {'_id': 0, 'id': 1})]
+    if not user_ids:
+        return
+    for name in ('expenses', 'expense_rollups', 'categories', 'budgets', 'recurring_expenses', 'export_jobs'):
+        db[name].delete_many({'user_id': {'$in': user_ids}})
+    db.users.delete_many({'id': {'$in': user_ids}})
+    print('Removed', len(user_ids), 'previously seeded users')
+
+
+def expense_counts():
+    weights = 1 / np.arange(1, args.users + 1) ** args.skew
+    counts = np.floor(weights / weights.sum() * args.expenses).astype(np.int64)
+    counts[:args.expenses - counts.sum()] += 1  # hand out the rounding remainder
+    return rng.permutation(counts)
+
+
+def insert_batches(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def user_expenses(user_id, count, today, created_at):
+    # Vectorized per user; only the final dicts are built row by row
+    days = rng.integers(0, args.years * 365, count)
+    shares = np.array([c[3] for c in CATEGORIES])
+    categories = rng.choice(len(CATEGORIES), count, p=shares / shares.sum())
+    typical = np.array([c[4] for c in CATEGORIES])[categories]
+    cents = np.maximum(np.round(rng.lognormal(np.log(typical * 100), 0.6)), 1).astype(np.int64)
+    methods = rng.choice(len(METHODS), count, p=METHOD_SHARES)
+    notes = rng.integers(0, len(NOTES), count)
+    for day, category, amount, method, note in zip(days.tolist(), categories.tolist(), cents.tolist(),
+                                                   methods.tolist(), notes.tolist()):
+        yield {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'category': CATEGORIES[category][0],
+            'amount_cents': Int64(amount),
+            'date': today - timedelta(days=day),
+            'payment_method': METHODS[method],
+            'notes': NOTES[note],
+            'receipt_url': '',
+            'created_at': created_at,
+        }
+
+
+def side_documents(user_id, today, created_at):
+    created = created_at.isoformat()
+    categories = [
+        {'id': str(uuid.uuid4()), 'user_id': user_id, 'name': name, 'icon': icon, 'color': color,
+         'is_custom': False, 'created_at': created}
+        for name, icon, color, _, _ in CATEGORIES
+    ]
+    budgets = []
+    month, year = today.month, today.year
+    for _ in range(12):
+        budgets.append({'id': str(uuid.uuid4()), 'user_id': user_id, 'month': month, 'year': year,
+                        'limit': float(rng.integers(10, 40) * 100), 'currency': 'USD', 'created_at': created})
+        month, year = (month - 1, year) if month > 1 else (12, year - 1)
+    # Due in the future, so the recurring scheduler leaves the dataset alone
+    recurring = [
+        {'id': str(uuid.uuid4()), 'user_id': user_id, 'category': 'Bills', 'amount': 49.99,
+         'frequency': 'monthly', 'next_date': (today + timedelta(days=30)).strftime('%Y-%m-%d'),
+         'payment_method': 'Card', 'notes': 'subscription', 'is_active': True, 'created_at': created},
+    ]
+    return categories, budgets, recurring
+
+
+def rebuild_rollups(user_ids):
+    # $merge needs the unique key the server creates; make sure it exists on a fresh database
+    db.expense_rollups.create_index(
+        [('user_id', 1), ('month', 1), ('category', 1), ('payment_method', 1)],
+        unique=True,
+        name='rollup_key',
+    )
+    # Same grouping as scripts/rebuild_expense_rollups.py, merged in for the seeded users only
+    db.expenses.aggregate([
+        {'$match': {'user_id': {'$in': user_ids}}},
+        {'$group': {
+            '_id': {
+                'user_id': '$user_id',
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                'category': '$category',
+                'payment_method': '$payment_method',
+            },
+            'total_cents': {'$sum': '$amount_cents'},
+            'count': {'$sum': 1},
+        }},
+        {'$project': {
+            '_id': 0,
+            'user_id': '$_id.user_id',
+            'month': '$_id.month',
+            'category': '$_id.category',
+            'payment_method': '$_id.payment_method',
+            'total_cents': {'$toLong': '$total_cents'},
+            'count': 1,
+        }},
+        {'$merge': {
+            'into': 'expense_rollups',
+            'on': ['user_id', 'month', 'category', 'payment_method'],
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert',
+        }},
+    ], allowDiskUse=True)
+
+
+drop_previous()
+started = time.perf_counter()
+now = datetime.now(timezone.utc)
+today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+# One hash for everyone: bcrypt per user would dominate seeding time
+password_hash = CryptContext(schemes=['bcrypt'], deprecated='auto').hash(PASSWORD)
+counts = expense_counts()
+
+users, manifest = [], []
+for i, count in enumerate(counts.tolist()):
+    user_id = str(uuid.uuid4())
+    email = f'{args.prefix}-{i}@example.com'
+    users.append({
+        'id': user_id, 'username': f'{args.prefix}{i}', 'email': email, 'password_hash': password_hash,
+        'currency': 'USD', 'created_at': now.isoformat(),
+    })
+    token = jwt.encode({'sub': user_id, 'exp': now + timedelta(days=TOKEN_EXPIRE_DAYS)}, SECRET_KEY, algorithm=ALGORITHM)
+    manifest.append({'user_id': user_id, 'email': email, 'password': PASSWORD, 'expenses': count, 'token': token})
+insert_batches(db.users, users)
+
+categories, budgets, recurring = [], [], []
+for user in users:
+    c, b, r = side_documents(user['id'], today, now)
+    categories += c
+    budgets += b
+    recurring += r
+insert_batches(db.categories, categories)
+insert_batches(db.budgets, budgets)
+insert_batches(db.recurring_expenses, recurring)
+
+written = 0
+for user, count in zip(users, counts.tolist()):
+    insert_batches(db.expenses, user_expenses(user['id'], count, today, now))
+    written += count
+    if written and written % 100_000 < count:
+        print(f'  {written:,} / {args.expenses:,} expenses')
+inserted = time.perf_counter() - started
+
+user_ids = [user['id'] for user in users]
+rollup_chunk = 500
+for start in range(0, len(user_ids), rollup_chunk):
+    rebuild_rollups(user_ids[start:start + rollup_chunk])
+total = time.perf_counter() - started
+
+Path(args.out).write_text(json.dumps({
+    'prefix': args.prefix,
+    'users': args.users,
+    'expenses': args.expenses,
+    'skew': args.skew,
+    'seed': args.seed,
+    'created_at': now.isoformat(),
+    'accounts': manifest,
+}, indent=1))
+print(f'Seeded {args.users:,} users and {args.expenses:,} expenses '
+      f'(largest user {counts.max():,}, median {int(np.median(counts)):,}) '
+      f'in {inserted:.1f}s ({args.expenses / max(inserted, 1e-9):,.0f} rows/s), rollups done at {total:.1f}s')
+print('Accounts and tokens written to', args.out)
+
+client.close()
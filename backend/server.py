@@ -1,32 +1,231 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+# Taken first so the startup log can report how long importing this module took
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, Query, UploadFile, File, Header
+from fastapi import Path as PathParam  # pathlib.Path is imported below
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument, IndexModel, UpdateOne, ASCENDING, DESCENDING, TEXT, monitoring
+from bson import Int64
+from pymongo.errors import DuplicateKeyError, OperationFailure, BulkWriteError, PyMongoError
+from gridfs import errors as gridfs_errors
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, field_serializer, field_validator
+from typing import List, Literal, Optional, Set
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone, timedelta, date
 import jwt
 from passlib.context import CryptContext
 import io
 import csv
-from fastapi.responses import StreamingResponse
-from openpyxl import Workbook
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import simpleSplit
+import json
+import base64
+import orjson
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.responses import StreamingResponse, ORJSONResponse, PlainTextResponse
+import hashlib
+import random
+import socket
+import calendar
+import hmac
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from concurrent.futures import ProcessPoolExecutor
+from pdf_report import render_expense_report
+import analytics
+from expense_cache import ExpenseTable, ExpenseTableCache
+from autocomplete import FIELDS as AUTOCOMPLETE_FIELDS, AutocompleteIndexes, PrefixIndex
+from change_feed import ChangeFeed, TooManyConnections
+from metrics import Registry, SIZE_BUCKETS
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Instrumentation, served on /metrics
+metrics_registry = Registry()
+HTTP_REQUESTS = metrics_registry.counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+HTTP_LATENCY = metrics_registry.histogram(
+    "http_request_duration_seconds", "Time to fully send the response, streamed bodies included.", ("method", "route"))
+HTTP_IN_FLIGHT = metrics_registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+HTTP_RESPONSE_SIZE = metrics_registry.histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS)
+MONGO_LATENCY = metrics_registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips.", ("collection", "command"))
+MONGO_FAILURES = metrics_registry.counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error.", ("collection", "command"))
+MONGO_DOCUMENTS = metrics_registry.counter(
+    "mongodb_documents_returned_total", "Documents returned in cursor batches.", ("collection", "command"))
+MONGO_POOL_WAIT = metrics_registry.histogram(
+    "mongodb_pool_wait_seconds", "Time spent waiting to check a connection out of the pool.")
+
+# Opt-in: log requests slower than this, with the Mongo commands they issued (0 = off)
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+# The commands issued by the current request while the slow log is on. Motor runs pymongo
+# calls in a copy of the caller's context, so the listener below sees the request's list.
+request_commands: ContextVar[Optional[list]] = ContextVar("request_commands", default=None)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._pending = {}  # (connection_id, request_id) -> (collection, command)
+
+    def started(self, event):
+        # The command's first field names its collection; getMore carries it separately
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        self._pending[(event.connection_id, event.request_id)] = (
+            target if isinstance(target, str) else "", event.command_name)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        cursor = event.reply.get("cursor")
+        documents = len(cursor.get("firstBatch") or cursor.get("nextBatch") or ()) if isinstance(cursor, dict) else 0
+        if documents:
+            MONGO_DOCUMENTS.inc(*labels, amount=documents)
+        self._record(event, labels, f"{documents} docs")
+
+    def failed(self, event):
+        labels = self._finish(event)
+        MONGO_FAILURES.inc(*labels)
+        self._record(event, labels, "failed")
+
+    def _finish(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), ("", event.command_name))
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, *labels)
+        return labels
+
+    def _record(self, event, labels, outcome):
+        commands = request_commands.get()
+        if commands is not None:
+            collection, command = labels
+            commands.append(f"{command} {collection} {event.duration_micros / 1000:.1f}ms ({outcome})")
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    # pymongo's check-out events carry no duration, so time them per thread: a check-out
+    # starts and ends on the thread running the operation
+    def __init__(self):
+        self._checkout = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._checkout.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self._observe_wait()
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait()
+
+    def _observe_wait(self):
+        started = getattr(self._checkout, "started", None)
+        if started is not None:
+            self._checkout.started = None
+            MONGO_POOL_WAIT.observe(time.perf_counter() - started)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+class MetricsMiddleware:
+    """Per-route request metrics and the slow-request log, as plain ASGI so streamed
+    responses are timed and sized through their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code, size, event_stream = 500, 0, False
+
+        async def send_counted(message):
+            nonlocal status_code, size, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        commands = [] if SLOW_REQUEST_MS else None
+        token = request_commands.set(commands)
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            request_commands.reset(token)
+            elapsed = time.perf_counter() - started
+            # The matched route's template keeps label cardinality bounded
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+            # A Server-Sent Events stream lasts as long as the client stays connected; its
+            # duration and size would swamp the histograms and the slow log
+            if not event_stream:
+                HTTP_LATENCY.observe(elapsed, method, route)
+                HTTP_RESPONSE_SIZE.observe(size, method, route)
+                if commands is not None and elapsed * 1000 >= SLOW_REQUEST_MS:
+                    logger.warning(
+                        "Slow request: %s %s -> %s in %.0fms, %d Mongo commands: %s",
+                        method, scope["path"], status_code, elapsed * 1000, len(commands),
+                        "; ".join(commands) or "none",
+                    )
+
+# MongoDB connection. The client is created in the app's lifespan (connect_mongo), not at
+# import, with pool settings taken from the environment when set
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+DB_NAME = os.environ['DB_NAME']
+MONGO_CLIENT_OPTIONS = {
+    option: cast(os.environ[name])
+    for name, option, cast in (
+        ("MONGO_MAX_POOL_SIZE", "maxPoolSize", int),
+        ("MONGO_MIN_POOL_SIZE", "minPoolSize", int),
+        ("MONGO_MAX_IDLE_TIME_MS", "maxIdleTimeMS", int),
+        ("MONGO_WAIT_QUEUE_TIMEOUT_MS", "waitQueueTimeoutMS", int),
+        ("MONGO_CONNECT_TIMEOUT_MS", "connectTimeoutMS", int),
+        ("MONGO_SERVER_SELECTION_TIMEOUT_MS", "serverSelectionTimeoutMS", int),
+        ("MONGO_SOCKET_TIMEOUT_MS", "socketTimeoutMS", int),
+        # e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+        ("MONGO_COMPRESSORS", "compressors", str),
+    )
+    if os.environ.get(name)
+}
+# Connections opened before the worker reports ready, so the first requests don't pay
+# for TCP and TLS handshakes
+MONGO_WARM_CONNECTIONS = int(os.environ.get("MONGO_WARM_CONNECTIONS", str(MONGO_CLIENT_OPTIONS.get("minPoolSize", 4))))
+client: Optional[AsyncIOMotorClient] = None
+db = None  # client[DB_NAME] once connected
+
+def connect_mongo():
+    global client, db, export_files
+    client = AsyncIOMotorClient(
+        mongo_url, tz_aware=True, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()], **MONGO_CLIENT_OPTIONS
+    )
+    db = client[DB_NAME]
+    export_files = AsyncIOMotorGridFSBucket(db, bucket_name="exports")
+
+async def warm_mongo_pool():
+    # Concurrent commands each check out a connection, making the pool open them now
+    await asyncio.gather(*(db.command("ping") for _ in range(max(MONGO_WARM_CONNECTIONS, 1))))
 
 # JWT Config
 # Normalize JWT secret: strip whitespace and surrounding quotes so .env quoting doesn't change the value
@@ -36,11 +235,26 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is deliberately slow, so hashing runs on its own thread pool (bcrypt releases the
+# GIL) and requests beyond AUTH_HASH_MAX_PENDING are turned away with a 503
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+AUTH_HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", "4"))
+AUTH_HASH_MAX_PENDING = int(os.environ.get("AUTH_HASH_MAX_PENDING", "64"))
+# Opt-in: re-hash a password on successful login when its stored hash uses other rounds
+PASSWORD_REHASH_ON_LOGIN = os.environ.get("PASSWORD_REHASH_ON_LOGIN", "false").lower() in ("1", "true", "yes")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 security = HTTPBearer()
 
-# Create the main app
-app = FastAPI()
+# Create the main app. start_worker and stop_worker are defined at the end of the module.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_worker()
+    try:
+        yield
+    finally:
+        await stop_worker()
+
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Models
@@ -78,8 +292,14 @@ class Expense(BaseModel):
     payment_method: str
     notes: Optional[str] = ""
     receipt_url: Optional[str] = ""
+    # Bumped by every update; documents from before versioning read as 0
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    @field_serializer("created_at")
+    def serialize_created_at(self, value: datetime) -> str:
+        return format_timestamp(value)
+
 class ExpenseCreate(BaseModel):
     category: str
     amount: float
@@ -88,6 +308,12 @@ class ExpenseCreate(BaseModel):
     notes: Optional[str] = ""
     receipt_url: Optional[str] = ""
 
+    @field_validator("date")
+    @classmethod
+    def normalize_date(cls, value: str) -> str:
+        # Stored as a BSON date, so it has to be a real calendar date
+        return date.fromisoformat(value[:10]).isoformat()
+
 class ExpenseUpdate(BaseModel):
     category: Optional[str] = None
     amount: Optional[float] = None
@@ -95,6 +321,13 @@ class ExpenseUpdate(BaseModel):
     payment_method: Optional[str] = None
     notes: Optional[str] = None
     receipt_url: Optional[str] = None
+    # The version the client last saw; the update is rejected with a 409 if it has moved on
+    version: Optional[int] = None
+
+    @field_validator("date")
+    @classmethod
+    def normalize_date(cls, value: Optional[str]) -> Optional[str]:
+        return None if value is None else date.fromisoformat(value[:10]).isoformat()
 
 class Category(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -119,12 +352,14 @@ class Budget(BaseModel):
     year: int
     limit: float
     currency: str = "USD"
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class BudgetCreate(BaseModel):
     month: int
     year: int
     limit: float
+    version: Optional[int] = None  # see ExpenseUpdate.version
 
 class RecurringExpense(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -147,28 +382,154 @@ class RecurringExpenseCreate(BaseModel):
     payment_method: str
     notes: Optional[str] = ""
 
+    @field_validator("next_date")
+    @classmethod
+    def normalize_next_date(cls, value: str) -> str:
+        # The scheduler compares and advances it as a calendar date
+        return date.fromisoformat(value[:10]).isoformat()
+
+class BulkExpenseItem(ExpenseCreate):
+    # Optional client-chosen key; re-sending a row with the same key is reported as a duplicate
+    import_key: Optional[str] = None
+
+class BulkExpenseRequest(BaseModel):
+    # Rows are validated one by one so a bad row is reported instead of rejecting the request
+    items: List[dict]
+
+class ExportJobCreate(BaseModel):
+    format: Literal["csv", "excel", "pdf"]
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    category: Optional[str] = None
+
+class ExportJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    format: str
+    status: str  # queued, running, done, failed
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    category: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    expires_at: datetime
+
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+hash_pending = 0
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def run_hash_job(func, *args):
+    global hash_pending
+    if hash_pending >= AUTH_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, func, *args)
+    finally:
+        hash_pending -= 1
+
+async def verify_password(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash is set only when rehash-on-login applies."""
+    if PASSWORD_REHASH_ON_LOGIN:
+        return await run_hash_job(pwd_context.verify_and_update, plain_password, hashed_password)
+    return await run_hash_job(pwd_context.verify, plain_password, hashed_password), None
+
+async def get_password_hash(password):
+    return await run_hash_job(pwd_context.hash, password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # jti keeps tokens issued in the same second distinct, so revoking one doesn't revoke the other
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class TokenCache:
+    """Bounded LRU of already-verified tokens -> user_id.
+
+    An entry never outlives the token's own exp claim (nor TOKEN_CACHE_TTL_SECONDS), so a
+    cache hit is exactly as valid as a fresh jwt.decode. Revocations are per process.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, token_lifetime_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.token_lifetime_seconds = token_lifetime_seconds
+        self._entries = OrderedDict()  # token -> (user_id, expires_at)
+        self._revoked_tokens = {}  # token -> exp, kept until the token would expire anyway
+        # user_id -> tokens issued in an earlier whole second are rejected. iat is whole
+        # seconds, so a token issued later in the cutoff second stays valid; kept until
+        # every token it covers has expired.
+        self._revoked_users = {}
+
+    def get(self, token: str) -> Optional[str]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return user_id
+
+    def is_revoked(self, token: str, payload: dict) -> bool:
+        if token in self._revoked_tokens:
+            return True
+        cutoff = self._revoked_users.get(payload.get("sub"))
+        return cutoff is not None and payload.get("iat", 0) < cutoff
+
+    def put(self, token: str, user_id: str, exp: float):
+        now = time.time()
+        self._entries[token] = (user_id, min(exp, now + self.ttl_seconds))
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def revoke_token(self, token: str, exp: float):
+        self._entries.pop(token, None)
+        now = time.time()
+        self._revoked_tokens = {t: e for t, e in self._revoked_tokens.items() if e > now}
+        self._revoked_tokens[token] = exp
+
+    def revoke_user(self, user_id: str):
+        now = int(time.time())
+        self._revoked_users = {
+            uid: cutoff for uid, cutoff in self._revoked_users.items()
+            if cutoff + self.token_lifetime_seconds > now
+        }
+        self._revoked_users[user_id] = now
+        for token in [t for t, (uid, _) in self._entries.items() if uid == user_id]:
+            del self._entries[token]
+
+token_cache = TokenCache(
+    max_entries=int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.environ.get("TOKEN_CACHE_TTL_SECONDS", "300")),
+    token_lifetime_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             logger.warning("JWT decode succeeded but 'sub' claim missing")
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        if token_cache.is_revoked(token, payload):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        token_cache.put(token, user_id, payload.get("exp", 0))
         return user_id
     except jwt.ExpiredSignatureError as e:
         logger.warning(f"JWT token expired: {e}")
@@ -181,6 +542,524 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         logger.warning(f"JWT decode error: {type(e).__name__}: {e}")
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+# Per-user data version: every mutating route bumps users.data_version, and everything
+# cached per user (responses, PDF reports) is keyed by it. Workers keep the last version
+# they saw for DATA_VERSION_TTL_SECONDS, so repeat reads skip the database entirely; a
+# worker sees its own writes immediately and other workers' within that TTL.
+# users.history_version is bumped alongside it only by expense writes dated before today,
+# i.e. the writes that can change an already-closed reporting period.
+DATA_VERSION_TTL_SECONDS = float(os.environ.get("DATA_VERSION_TTL_SECONDS", "2"))
+DATA_VERSION_MAX_USERS = 50000
+data_versions = OrderedDict()  # user_id -> (data_version, history_version, fetched_at, currency)
+VERSION_FIELDS = {"_id": 0, "data_version": 1, "history_version": 1, "currency": 1}
+
+def remember_data_version(user_id: str, user: dict):
+    # Versions only go up. A refresh read before this worker's latest bump can land after
+    # it, so the larger of the two is kept rather than the one stored last.
+    data_version, history_version = user.get("data_version", 0), user.get("history_version", 0)
+    previous = data_versions.get(user_id)
+    if previous:
+        data_version, history_version = max(data_version, previous[0]), max(history_version, previous[1])
+    data_versions[user_id] = (data_version, history_version, time.monotonic(), user.get("currency", "USD"))
+    data_versions.move_to_end(user_id)
+    while len(data_versions) > DATA_VERSION_MAX_USERS:
+        data_versions.popitem(last=False)
+
+async def get_versions(user_id: str) -> tuple:
+    entry = data_versions.get(user_id)
+    if not entry or time.monotonic() - entry[2] >= DATA_VERSION_TTL_SECONDS:
+        user = await db.users.find_one({"id": user_id}, VERSION_FIELDS)
+        remember_data_version(user_id, user or {})
+        entry = data_versions[user_id]
+    return entry[0], entry[1]
+
+async def get_data_version(user_id: str) -> int:
+    return (await get_versions(user_id))[0]
+
+async def get_history_version(user_id: str) -> int:
+    return (await get_versions(user_id))[1]
+
+async def get_user_currency(user_id: str) -> str:
+    # Currency is fixed at registration, so any remembered entry will do, however old
+    entry = data_versions.get(user_id)
+    if not entry:
+        await get_versions(user_id)
+        entry = data_versions[user_id]
+    return entry[3]
+
+async def bump_data_version(user_id: str, history: bool = False):
+    inc = {"data_version": 1, "history_version": 1} if history else {"data_version": 1}
+    user = await db.users.find_one_and_update(
+        {"id": user_id},
+        {"$inc": inc},
+        VERSION_FIELDS,
+        return_document=ReturnDocument.AFTER
+    )
+    if user:
+        remember_data_version(user_id, user)
+        expense_cache.advance(user_id, user["data_version"])
+        autocomplete_indexes.advance(user_id, user["data_version"])
+
+class BytesLRUCache:
+    """Size-bounded LRU of bytes values; evicts least recently used entries past max_bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+response_cache = BytesLRUCache(int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    return etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+
+async def cached_json_response(request: Request, user_id: str, compute, vary: str = ""):
+    """Serve a per-user GET from the response cache, with a strong ETag and 304 support.
+
+    compute() runs only on a miss and must return JSON-ready data (see project_docs).
+    vary keys in anything else the result depends on, such as today's date.
+    """
+    version = await get_data_version(user_id)
+    key = f"{user_id}:{version}:{vary}:{request.url.path}?{request.url.query}"
+    body = response_cache.get(key)
+    if body is None:
+        body = orjson.dumps(await compute())
+        response_cache.put(key, body)
+    etag = f'"{hashlib.sha256(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Fast path for list endpoints: documents we wrote ourselves are already in the response
+# shape, so they are projected to the model's fields, given the model's defaults for
+# fields older documents may lack, and encoded with orjson instead of being re-validated
+# through response_model. created_at stays the ISO string it is stored as.
+def response_fields(model) -> dict:
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+def field_defaults(model) -> dict:
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+def project_docs(docs: List[dict], defaults: dict) -> List[dict]:
+    if defaults:
+        for doc in docs:
+            for name, default in defaults.items():
+                if doc.get(name) is None:
+                    doc[name] = default
+    return docs
+
+EXPENSE_FIELDS, EXPENSE_DEFAULTS = {**response_fields(Expense), "amount_cents": 1}, field_defaults(Expense)
+CATEGORY_FIELDS, CATEGORY_DEFAULTS = response_fields(Category), field_defaults(Category)
+BUDGET_FIELDS, BUDGET_DEFAULTS = response_fields(Budget), field_defaults(Budget)
+RECURRING_FIELDS, RECURRING_DEFAULTS = response_fields(RecurringExpense), field_defaults(RecurringExpense)
+
+# Expense storage format: date and created_at are BSON dates and the amount is int64
+# cents in amount_cents, so range scans and aggregations are typed and exact. Documents
+# written before scripts/migrate_expense_storage.py ran still hold ISO-string dates and a
+# float amount; every read goes through decode_expense and every filter matches both
+# shapes until the migration has finished.
+def to_cents(amount: float) -> Int64:
+    return Int64(round(amount * 100))
+
+def to_bson_date(value: str) -> datetime:
+    day = date.fromisoformat(value[:10])
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+def encode_expense(expense: dict) -> dict:
+    """Convert an API-shaped expense (or $set fields) to the storage format."""
+    doc = dict(expense)
+    if "amount" in doc:
+        doc["amount_cents"] = to_cents(doc.pop("amount"))
+    if isinstance(doc.get("date"), str):
+        doc["date"] = to_bson_date(doc["date"])
+    if isinstance(doc.get("created_at"), str):
+        doc["created_at"] = datetime.fromisoformat(doc["created_at"])
+    return doc
+
+def format_timestamp(value) -> str:
+    """An expense's created_at as every response carries it: UTC to the millisecond with a
+    Z suffix, the precision MongoDB stores, so a fresh write and a later read match."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def decode_expense(doc: dict) -> dict:
+    """Convert a stored expense of either format to the API shape, in place."""
+    if "amount_cents" in doc:
+        doc["amount"] = doc.pop("amount_cents") / 100
+    if isinstance(doc.get("date"), datetime):
+        doc["date"] = doc["date"].strftime("%Y-%m-%d")
+    if "created_at" in doc:
+        doc["created_at"] = format_timestamp(doc["created_at"])
+    return doc
+
+def expense_cents(doc: dict) -> int:
+    return doc["amount_cents"] if "amount_cents" in doc else round(doc["amount"] * 100)
+
+def expense_month(doc: dict) -> str:
+    value = doc["date"]
+    return value.strftime("%Y-%m") if isinstance(value, datetime) else value[:7]
+
+def expense_day(doc: dict) -> date:
+    value = doc["date"]
+    return value.date() if isinstance(value, datetime) else date.fromisoformat(value[:10])
+
+def touches_history(expenses: List[dict]) -> bool:
+    """True if any of these (stored) expenses falls before today, see history_version."""
+    today = datetime.now(timezone.utc).date()
+    return any(expense_day(expense) < today for expense in expenses)
+
+# Expense rollups: one row per (user_id, month, category, payment_method) holding the
+# running total (int64 cents) and count, kept current by the expense write routes with
+# $inc deltas
+def rollup_key(expense: dict) -> dict:
+    return {
+        "user_id": expense["user_id"],
+        "month": expense_month(expense),  # YYYY-MM
+        "category": expense["category"],
+        "payment_method": expense["payment_method"],
+    }
+
+async def apply_rollup_delta(expense: dict, sign: int):
+    key = rollup_key(expense)
+    await db.expense_rollups.update_one(
+        key,
+        {"$inc": {"total_cents": Int64(sign * expense_cents(expense)), "count": sign}},
+        upsert=True
+    )
+    if sign < 0:
+        # Drop rows whose last expense has gone so rollups don't accumulate empty keys
+        await db.expense_rollups.delete_one({**key, "count": {"$lte": 0}})
+
+async def apply_rollup_deltas(expenses: List[dict]):
+    # Bulk counterpart of apply_rollup_delta(expense, 1): one $inc per rollup key, one round trip
+    deltas = {}
+    for expense in expenses:
+        key = tuple(rollup_key(expense).items())
+        total, count = deltas.get(key, (0, 0))
+        deltas[key] = (total + expense_cents(expense), count + 1)
+    if deltas:
+        await db.expense_rollups.bulk_write([
+            UpdateOne(dict(key), {"$inc": {"total_cents": Int64(total), "count": count}}, upsert=True)
+            for key, (total, count) in deltas.items()
+        ], ordered=False)
+
+# Columnar expense cache (see expense_cache.py). Opt-in: EXPENSE_CACHE_MAX_BYTES=0, the
+# default, disables it. The expense write routes keep cached tables current in place via
+# update_expense_caches before they bump the data version, along with the autocomplete
+# indexes (see autocomplete.py).
+expense_cache = ExpenseTableCache(int(os.environ.get("EXPENSE_CACHE_MAX_BYTES", "0")))
+autocomplete_indexes = AutocompleteIndexes(int(os.environ.get("AUTOCOMPLETE_MAX_USERS", "10000")))
+EXPENSE_CACHE_PROJECTION = {
+    "_id": 0, "id": 1, "date": 1, "amount_cents": 1, "amount": 1,
+    "category": 1, "payment_method": 1, "notes": 1,
+}
+
+def expense_row(doc: dict) -> tuple:
+    """Stored expense -> ExpenseTable row; raises ValueError for an unreadable legacy date."""
+    return (
+        doc["id"],
+        expense_day(doc).toordinal() - analytics.EPOCH_ORDINAL,
+        expense_cents(doc),
+        doc.get("category") or "",
+        doc.get("payment_method") or "",
+        doc.get("notes") or "",
+    )
+
+def update_expense_caches(user_id: str, added: List[dict] = (), removed: List[dict] = ()):
+    """Apply written (added) and replaced or deleted (removed) expense documents."""
+    autocomplete_indexes.apply(user_id, added, removed)
+    table = expense_cache.peek(user_id)
+    if table is None:
+        return
+    try:
+        rows = [expense_row(doc) for doc in added]
+    except ValueError:
+        expense_cache.drop(user_id)
+        return
+    for doc in removed:
+        table.remove(doc["id"])
+    table.append(rows)
+    expense_cache.resize(user_id)
+
+async def cached_expense_table(user_id: str) -> Optional[ExpenseTable]:
+    """The user's cached table, loading it on a miss; None if the cache is off or can't hold it."""
+    if not expense_cache.enabled:
+        return None
+    version = await get_data_version(user_id)
+    table = expense_cache.get(user_id, version)
+    if table is not None:
+        return table
+    # Loaded at the version read above: a write landing meanwhile bumps past it, so the
+    # next read reloads rather than trusting a table that may have missed it
+    table = ExpenseTable(version)
+    cursor = db.expenses.find({"user_id": user_id}, EXPENSE_CACHE_PROJECTION, batch_size=EXPORT_BATCH_SIZE)
+    while True:
+        batch = await cursor.to_list(EXPORT_BATCH_SIZE)
+        if not batch:
+            break
+        try:
+            table.append([expense_row(doc) for doc in batch])
+        except ValueError:
+            return None  # unmigrated rows with unreadable dates stay on the query path
+    expense_cache.put(user_id, table)
+    logger.debug(f"Cached {table.size} expenses for {user_id}; cache now {expense_cache.stats()}")
+    return table
+
+# Live change feed for GET /api/changes (see change_feed.py). With CHANGE_FEED_SOURCE=local,
+# the default, the write routes publish their own changes, which reaches only streams on
+# the same worker. With several workers set it to change_streams: every worker then
+# follows one MongoDB change stream (needs a replica set; deletes need MongoDB 6.0+
+# pre-images, enabled at startup) and the Last-Event-ID is the stream's resume token.
+CHANGE_FEED_SOURCE = os.environ.get("CHANGE_FEED_SOURCE", "local").lower()
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.environ.get("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+# Streams are closed after this long and the client resumes from its last event, which
+# re-checks its token and keeps shutdown from waiting on them
+CHANGE_FEED_MAX_STREAM_SECONDS = float(os.environ.get("CHANGE_FEED_MAX_STREAM_SECONDS", "300"))
+# Writes touching more documents than this send one invalidate event instead of a delta each
+CHANGE_FEED_MAX_DELTAS = 100
+change_feed = ChangeFeed(int(os.environ.get("CHANGE_FEED_MAX_CONNECTIONS_PER_USER", "5")))
+# collection -> (entity name in events, response fields, defaults)
+CHANGE_ENTITIES = {
+    "expenses": ("expense", EXPENSE_FIELDS, EXPENSE_DEFAULTS),
+    "categories": ("category", CATEGORY_FIELDS, CATEGORY_DEFAULTS),
+    "budgets": ("budget", BUDGET_FIELDS, BUDGET_DEFAULTS),
+    "recurring_expenses": ("recurring", RECURRING_FIELDS, RECURRING_DEFAULTS),
+}
+
+def change_event(collection: str, doc: Optional[dict] = None, deleted_id: Optional[str] = None) -> dict:
+    """Compact event for a written (doc) or deleted document, in the API's response shape."""
+    entity, fields, defaults = CHANGE_ENTITIES[collection]
+    if doc is None:
+        return {"entity": entity, "op": "delete", "id": deleted_id}
+    doc = {name: doc[name] for name in fields if name != "_id" and name in doc}
+    if collection == "expenses":
+        decode_expense(doc)
+    return {"entity": entity, "op": "upsert", "doc": project_docs([doc], defaults)[0]}
+
+def publish_changes(user_id: str, collection: str, upserted: List[dict] = (), deleted_ids: List[str] = ()):
+    """Publish a write route's changes; a no-op when the change stream publishes them."""
+    if CHANGE_FEED_SOURCE != "local":
+        return
+    if len(upserted) + len(deleted_ids) > CHANGE_FEED_MAX_DELTAS:
+        change_feed.publish(user_id, {"entity": CHANGE_ENTITIES[collection][0], "op": "invalidate"})
+        return
+    for deleted_id in deleted_ids:
+        change_feed.publish(user_id, change_event(collection, deleted_id=deleted_id))
+    for doc in upserted:
+        change_feed.publish(user_id, change_event(collection, doc))
+
+# Rollup rows hold int64 total_cents; rows last rebuilt before the cents migration may
+# still carry (part of) their sum in the old float total field
+ROLLUP_CENTS = {"$add": [
+    {"$ifNull": ["$total_cents", 0]},
+    {"$round": [{"$multiply": [{"$ifNull": ["$total", 0]}, 100]}, 0]},
+]}
+
+# Indexes every route query relies on. Created idempotently at startup; run
+# scripts/check_query_plans.py to confirm no route falls back to a collection scan.
+INDEX_MODELS = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "expenses": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Serves the keyset-paginated list, date-range filters and per-user scans
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)], name="user_date_id"),
+        # Dedupes bulk/imported rows that carry a client idempotency key
+        IndexModel(
+            [("user_id", ASCENDING), ("import_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"import_key": {"$exists": True}},
+            name="user_import_key"
+        ),
+        # /expenses/search; the user_id prefix keeps each search within one user's entries
+        IndexModel(
+            [("user_id", ASCENDING), ("notes", TEXT), ("category", TEXT)],
+            weights={"notes": 1, "category": 2},
+            name="user_text"
+        ),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "budgets": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING), ("year", ASCENDING)], unique=True, name="user_month_year"),
+    ],
+    "recurring_expenses": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # The scheduler's due-items scan
+        IndexModel([("is_active", ASCENDING), ("next_date", ASCENDING)], name="active_next_date"),
+    ],
+    "expense_rollups": [
+        IndexModel(
+            [("user_id", ASCENDING), ("month", ASCENDING), ("category", ASCENDING), ("payment_method", ASCENDING)],
+            unique=True,
+            name="rollup_key"
+        ),
+    ],
+    "export_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        # A pending job holds one of its user's EXPORT_JOBS_PER_USER numbered slots
+        IndexModel(
+            [("user_id", ASCENDING), ("slot", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"slot": {"$exists": True}},
+            name="user_slot"
+        ),
+        # Workers claim the oldest queued job; the sweeper finds stale running ones
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_ttl"),
+    ],
+    "exports.files": [
+        IndexModel([("metadata.expires_at", ASCENDING)], name="expires_at"),
+    ],
+}
+
+# "collection.index" names that couldn't be created, reported by /ready
+missing_indexes: Set[str] = set()
+
+async def ensure_indexes():
+    # One at a time, so a spec that fails doesn't keep the rest of its collection's from
+    # being built
+    for collection, models in INDEX_MODELS.items():
+        for model in models:
+            name = f"{collection}.{model.document['name']}"
+            try:
+                await db[collection].create_indexes([model])
+                missing_indexes.discard(name)
+            except OperationFailure as e:
+                # Typically existing duplicates blocking a unique index; keep serving and surface it
+                missing_indexes.add(name)
+                logger.error(f"Could not create index {name}: {e}")
+
+INDEX_RETRY_SECONDS = float(os.environ.get("INDEX_RETRY_SECONDS", "15"))
+
+async def retry_ensure_indexes():
+    # Started when MongoDB couldn't be reached at startup; /ready reports 503 meanwhile
+    while True:
+        await asyncio.sleep(INDEX_RETRY_SECONDS)
+        try:
+            await ensure_indexes()
+        except PyMongoError as e:
+            logger.warning(f"Index creation failed, retrying in {INDEX_RETRY_SECONDS:g}s: {e}")
+            continue
+        logger.info("Indexes created")
+        return
+
+# Keyset pagination: the cursor is the (date, id) of the last row on the previous page,
+# so later pages don't shift when rows are inserted ahead of them
+EXPENSES_PAGE_DEFAULT = 100
+EXPENSES_PAGE_MAX = 1000
+
+def cursor_key(expense: dict) -> list:
+    # Taken from the stored document; the flag records whether its date was a BSON date
+    value = expense["date"]
+    is_bson = isinstance(value, datetime)
+    day = value.strftime("%Y-%m-%d") if is_bson else value
+    return [day, expense["id"], is_bson]
+
+def parse_cursor_key(day, expense_id, is_bson):
+    if not isinstance(day, str) or not isinstance(expense_id, str):
+        raise ValueError("malformed cursor")
+    return (to_bson_date(day) if is_bson else day), expense_id
+
+def encode_cursor(expense: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursor_key(expense)).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        return parse_cursor_key(*json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_condition(after, expense_id: str) -> dict:
+    # Descending BSON order puts dates before strings, so while unmigrated documents
+    # remain, a page that ends on a BSON date continues into all string-dated rows
+    condition = {"$or": [
+        {"date": {"$lt": after}},
+        {"date": after, "id": {"$lt": expense_id}},
+    ]}
+    if isinstance(after, datetime):
+        condition["$or"].append({"date": {"$type": "string"}})
+    return condition
+
+def parse_date_param(value: str) -> str:
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+def range_condition(field: str, legacy_field: str, bounds: dict, encode) -> dict:
+    # Range comparisons are type-bracketed, so each stored shape needs its own branch
+    return {"$or": [
+        {field: {op: encode(v) for op, v in bounds.items()}},
+        {legacy_field: bounds},
+    ]}
+
+def expense_query(
+    user_id: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+) -> dict:
+    query = {"user_id": user_id}
+    conditions = []
+    if date_from or date_to:
+        bounds = {}
+        if date_from:
+            bounds["$gte"] = parse_date_param(date_from)
+        if date_to:
+            bounds["$lte"] = parse_date_param(date_to)
+        conditions.append(range_condition("date", "date", bounds, to_bson_date))
+    if category:
+        query["category"] = category
+    if payment_method:
+        query["payment_method"] = payment_method
+    if min_amount is not None or max_amount is not None:
+        bounds = {}
+        if min_amount is not None:
+            bounds["$gte"] = min_amount
+        if max_amount is not None:
+            bounds["$lte"] = max_amount
+        conditions.append(range_condition("amount_cents", "amount", bounds, to_cents))
+    if conditions:
+        query["$and"] = conditions
+    return query
+
 # Auth Routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user: UserCreate):
@@ -190,7 +1069,7 @@ async def register(user: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    password_hash = get_password_hash(user.password)
+    password_hash = await get_password_hash(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
@@ -200,7 +1079,11 @@ async def register(user: UserCreate):
     
     user_dict = new_user.model_dump()
     user_dict['created_at'] = user_dict['created_at'].isoformat()
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # A concurrent registration with the same email won the unique index
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create default categories
     default_categories = [
@@ -213,6 +1096,7 @@ async def register(user: UserCreate):
         {"name": "Other", "icon": "MoreHorizontal", "color": "#606C38"}
     ]
     
+    categories = []
     for cat in default_categories:
         category = Category(
             user_id=new_user.id,
@@ -223,7 +1107,8 @@ async def register(user: UserCreate):
         )
         cat_dict = category.model_dump()
         cat_dict['created_at'] = cat_dict['created_at'].isoformat()
-        await db.categories.insert_one(cat_dict)
+        categories.append(cat_dict)
+    await db.categories.insert_many(categories)
     
     # Generate token
     access_token = create_access_token(data={"sub": new_user.id})
@@ -242,8 +1127,17 @@ async def register(user: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user: UserLogin):
     db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password_hash"]):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    valid, new_hash = await verify_password(user.password, db_user["password_hash"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # Only replace the hash we verified, in case a password change raced this login
+        await db.users.update_one(
+            {"id": db_user["id"], "password_hash": db_user["password_hash"]},
+            {"$set": {"password_hash": new_hash}}
+        )
     
     access_token = create_access_token(data={"sub": db_user["id"]})
     
@@ -258,6 +1152,12 @@ async def login(user: UserLogin):
         }
     }
 
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security), user_id: str = Depends(get_current_user)):
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.revoke_token(credentials.credentials, payload.get("exp", 0))
+    return {"message": "Logged out successfully"}
+
 @api_router.get("/auth/me")
 async def get_me(user_id: str = Depends(get_current_user)):
     user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
@@ -265,62 +1165,340 @@ async def get_me(user_id: str = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+# Optimistic concurrency: documents carry a version that every update increments. A
+# client that sends back the version it loaded only overwrites the document if nobody
+# else has changed it since; otherwise it gets a 409 instead of silently losing an edit.
+def version_condition(expected: int) -> dict:
+    # Documents written before versioning have no field and read as version 0. $exists
+    # rather than an equality on null, so an upsert doesn't copy the null into a new document.
+    return {"version": expected} if expected else {"version": {"$exists": False}}
+
+async def stale_or_missing(collection, doc_id: str, user_id: str, label: str) -> HTTPException:
+    # Only run after a versioned write matched nothing, to tell the two cases apart
+    if await collection.find_one({"id": doc_id, "user_id": user_id}, {"_id": 1}):
+        return HTTPException(status_code=409, detail=f"{label} was changed elsewhere; reload it and try again")
+    return HTTPException(status_code=404, detail=f"{label} not found")
+
 # Expense Routes
 @api_router.post("/expenses", response_model=Expense)
 async def create_expense(expense: ExpenseCreate, user_id: str = Depends(get_current_user)):
-    new_expense = Expense(user_id=user_id, **expense.model_dump())
-    expense_dict = new_expense.model_dump()
-    expense_dict['created_at'] = expense_dict['created_at'].isoformat()
+    new_expense = Expense(user_id=user_id, version=1, **expense.model_dump())
+    expense_dict = encode_expense(new_expense.model_dump())
     await db.expenses.insert_one(expense_dict)
+    await apply_rollup_delta(expense_dict, 1)
+    update_expense_caches(user_id, added=[expense_dict])
+    await bump_data_version(user_id, touches_history([expense_dict]))
+    publish_changes(user_id, "expenses", upserted=[expense_dict])
     return new_expense
 
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", "50000"))
+IMPORT_COLUMNS = {"date", "category", "amount", "payment_method", "notes"}
+
+async def ingest_expenses(user_id: str, rows: List[dict], idempotency_key: Optional[str] = None, first_row: int = 0):
+    """Validate and insert rows chunk by chunk; returns counts plus a per-row error list.
+
+    Row numbers in the report start at first_row. Without a per-row import_key, an
+    Idempotency-Key makes each row's key "<key>:<row>", so a retried upload is deduped.
+    """
+    report = {"inserted": 0, "duplicates": 0, "errors": []}
+    created_at = datetime.now(timezone.utc)
+    history = False
+    written = []
+
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        docs, doc_rows = [], []
+        for offset, raw in enumerate(rows[start:start + BULK_CHUNK_SIZE]):
+            row = first_row + start + offset
+            try:
+                item = BulkExpenseItem.model_validate(raw)
+            except ValidationError as e:
+                report["errors"].append({
+                    "row": row,
+                    "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                })
+                continue
+            doc = encode_expense({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                **item.model_dump(exclude={"import_key"}),
+                "version": 1,
+                "created_at": created_at
+            })
+            import_key = item.import_key or (f"{idempotency_key}:{row}" if idempotency_key else None)
+            if import_key:
+                doc["import_key"] = import_key
+            docs.append(doc)
+            doc_rows.append(row)
+        if not docs:
+            continue
+
+        failed = set()
+        try:
+            await db.expenses.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details["writeErrors"]:
+                failed.add(err["index"])
+                if err["code"] == 11000:
+                    report["duplicates"] += 1
+                else:
+                    report["errors"].append({"row": doc_rows[err["index"]], "error": err["errmsg"]})
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+        report["inserted"] += len(inserted)
+        history = history or touches_history(inserted)
+        await apply_rollup_deltas(inserted)
+        update_expense_caches(user_id, added=inserted)
+        if len(written) <= CHANGE_FEED_MAX_DELTAS:
+            written += inserted
+
+    if report["inserted"]:
+        await bump_data_version(user_id, history)
+        publish_changes(user_id, "expenses", upserted=written)
+    return report
+
+def import_header(value) -> str:
+    # Accepts both the CSV export header (payment_method) and the Excel one (Payment Method)
+    return str(value or "").strip().lower().replace(" ", "_")
+
+def parse_csv_rows(stream) -> List[dict]:
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    header = [import_header(h) for h in next(reader, [])]
+    return [
+        {k: v for k, v in zip(header, values) if k in IMPORT_COLUMNS}
+        for values in reader
+    ]
+
+def parse_excel_rows(stream) -> List[dict]:
+    from openpyxl import load_workbook
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        ws = wb["Expenses"] if "Expenses" in wb.sheetnames else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = [import_header(h) for h in next(rows, ())]
+        parsed = []
+        for values in rows:
+            row = {}
+            for k, v in zip(header, values):
+                if k not in IMPORT_COLUMNS:
+                    continue
+                if isinstance(v, (datetime, date)):
+                    v = v.strftime("%Y-%m-%d")
+                row[k] = "" if v is None and k == "notes" else v
+            parsed.append(row)
+        return parsed
+    finally:
+        wb.close()
+
+@api_router.post("/expenses/bulk")
+async def bulk_create_expenses(
+    payload: BulkExpenseRequest,
+    idempotency_key: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user)
+):
+    if len(payload.items) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+    return await ingest_expenses(user_id, payload.items, idempotency_key)
+
+@api_router.post("/expenses/import")
+async def import_expenses(
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user)
+):
+    filename = (file.filename or "").lower()
+    if filename.endswith(".xlsx"):
+        parser = parse_excel_rows
+    elif filename.endswith(".csv"):
+        parser = parse_csv_rows
+    else:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file in the export layout")
+
+    rows = await asyncio.get_running_loop().run_in_executor(export_executor, parser, file.file)
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per import")
+    # Row 1 is the header, so data rows are numbered as a spreadsheet would show them
+    return await ingest_expenses(user_id, rows, idempotency_key, first_row=2)
+
 @api_router.get("/expenses", response_model=List[Expense])
-async def get_expenses(user_id: str = Depends(get_current_user)):
-    expenses = await db.expenses.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
+async def get_expenses(
+    limit: int = Query(EXPENSES_PAGE_DEFAULT, ge=1, le=EXPENSES_PAGE_MAX),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    user_id: str = Depends(get_current_user)
+):
+    query = expense_query(user_id, date_from, date_to, category, payment_method, min_amount, max_amount)
+    if cursor:
+        query.setdefault("$and", []).append(keyset_condition(*decode_cursor(cursor)))
+
+    # Newest first; id breaks ties between expenses on the same day
+    expenses = await db.expenses.find(query, EXPENSE_FIELDS).sort(
+        [("date", -1), ("id", -1)]
+    ).limit(limit).to_list(limit)
+    headers = {}
+    if len(expenses) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(expenses[-1])
     for expense in expenses:
-        if isinstance(expense['created_at'], str):
-            expense['created_at'] = datetime.fromisoformat(expense['created_at'])
-    return expenses
+        decode_expense(expense)
+    return ORJSONResponse(project_docs(expenses, EXPENSE_DEFAULTS), headers=headers)
+
+# Full-text search over notes and category, best matches first. Pages continue from a
+# (score, date, id) cursor; scores can't be range-scanned in an index, so each page
+# re-ranks all of the user's matches. A term matching more than SEARCH_MAX_MATCHES
+# expenses is rejected rather than ranked, which bounds what a page reads and sorts.
+SEARCH_PAGE_DEFAULT = 50
+SEARCH_MAX_MATCHES = int(os.environ.get("SEARCH_MAX_MATCHES", "5000"))
+
+def encode_search_cursor(expense: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([expense["score"], *cursor_key(expense)]).encode()).decode()
+
+def decode_search_cursor(cursor: str):
+    try:
+        score, *key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), *parse_cursor_key(*key)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/expenses/search", response_model=List[Expense])
+async def search_expenses(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_DEFAULT, ge=1, le=EXPENSES_PAGE_MAX),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    page = []
+    if cursor:
+        score, after, expense_id = decode_search_cursor(cursor)
+        page.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"$and": [{"score": score}, keyset_condition(after, expense_id)]},
+        ]}})
+    page += [
+        {"$sort": {"score": -1, "date": -1, "id": -1}},
+        {"$limit": limit},
+        {"$project": {**EXPENSE_FIELDS, "score": 1}},
+    ]
+    # Reads at most one match past the cap, enough to tell that the term is too broad
+    result = await db.expenses.aggregate([
+        {"$match": {"user_id": user_id, "$text": {"$search": q}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$limit": SEARCH_MAX_MATCHES + 1},
+        {"$facet": {"matches": [{"$count": "n"}], "page": page}},
+    ]).to_list(1)
+    if result[0]["matches"] and result[0]["matches"][0]["n"] > SEARCH_MAX_MATCHES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search matches more than {SEARCH_MAX_MATCHES} expenses; use a more specific term"
+        )
+    expenses = result[0]["page"]
+    headers = {}
+    if len(expenses) == limit:
+        headers["X-Next-Cursor"] = encode_search_cursor(expenses[-1])
+    for expense in expenses:
+        del expense["score"]
+        decode_expense(expense)
+    return ORJSONResponse(project_docs(expenses, EXPENSE_DEFAULTS), headers=headers)
+
+AUTOCOMPLETE_LIMIT_DEFAULT = 8
+
+async def user_autocomplete_indexes(user_id: str) -> dict:
+    version = await get_data_version(user_id)
+    indexes = autocomplete_indexes.get(user_id, version)
+    if indexes is None:
+        # The rollups already hold per-value expense counts, so there is no need to scan
+        # the user's expenses
+        counts = await db.expense_rollups.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$facet": {
+                field: [{"$group": {"_id": f"${field}", "count": {"$sum": "$count"}}}]
+                for field in AUTOCOMPLETE_FIELDS
+            }},
+        ]).to_list(1)
+        indexes = {
+            field: PrefixIndex({row["_id"]: row["count"] for row in counts[0][field] if isinstance(row["_id"], str)})
+            for field in AUTOCOMPLETE_FIELDS
+        }
+        autocomplete_indexes.put(user_id, version, indexes)
+    return indexes
+
+@api_router.get("/expenses/autocomplete")
+async def autocomplete_expense_values(
+    field: Literal["category", "payment_method"],
+    prefix: str = Query("", max_length=100),
+    limit: int = Query(AUTOCOMPLETE_LIMIT_DEFAULT, ge=1, le=50),
+    user_id: str = Depends(get_current_user)
+):
+    indexes = await user_autocomplete_indexes(user_id)
+    return ORJSONResponse(indexes[field].complete(prefix, limit))
 
 @api_router.get("/expenses/{expense_id}", response_model=Expense)
 async def get_expense(expense_id: str, user_id: str = Depends(get_current_user)):
     expense = await db.expenses.find_one({"id": expense_id, "user_id": user_id}, {"_id": 0})
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
-    if isinstance(expense['created_at'], str):
-        expense['created_at'] = datetime.fromisoformat(expense['created_at'])
-    return expense
+    return decode_expense(expense)
 
 @api_router.put("/expenses/{expense_id}", response_model=Expense)
 async def update_expense(expense_id: str, expense_update: ExpenseUpdate, user_id: str = Depends(get_current_user)):
-    existing = await db.expenses.find_one({"id": expense_id, "user_id": user_id})
+    update_data = encode_expense({
+        k: v for k, v in expense_update.model_dump(exclude={"version"}).items() if v is not None
+    })
+    query = {"id": expense_id, "user_id": user_id}
+    if expense_update.version is not None:
+        query.update(version_condition(expense_update.version))
+    if update_data:
+        update = {"$set": update_data, "$inc": {"version": 1}}
+        if "amount_cents" in update_data:
+            # Drop the legacy float so a half-migrated document can't carry two amounts
+            update["$unset"] = {"amount": ""}
+        # Take the pre-image atomically so the rollup delta matches what was replaced
+        existing = await db.expenses.find_one_and_update(
+            query,
+            update,
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+    else:
+        existing = await db.expenses.find_one(query, {"_id": 0})
     if not existing:
+        if expense_update.version is not None:
+            raise await stale_or_missing(db.expenses, expense_id, user_id, "Expense")
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    update_data = {k: v for k, v in expense_update.model_dump().items() if v is not None}
+    updated = {**existing, **update_data}
+    if "amount_cents" in update_data:
+        updated.pop("amount", None)
     if update_data:
-        await db.expenses.update_one({"id": expense_id}, {"$set": update_data})
-    
-    updated = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    return updated
+        updated["version"] = existing.get("version", 0) + 1
+        await apply_rollup_delta(existing, -1)
+        await apply_rollup_delta(updated, 1)
+        update_expense_caches(user_id, added=[updated], removed=[existing])
+        await bump_data_version(user_id, touches_history([existing, updated]))
+        publish_changes(user_id, "expenses", upserted=[updated])
+    return decode_expense(updated)
 
 @api_router.delete("/expenses/{expense_id}")
 async def delete_expense(expense_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.expenses.delete_one({"id": expense_id, "user_id": user_id})
-    if result.deleted_count == 0:
+    deleted = await db.expenses.find_one_and_delete({"id": expense_id, "user_id": user_id})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Expense not found")
+    await apply_rollup_delta(deleted, -1)
+    update_expense_caches(user_id, removed=[deleted])
+    await bump_data_version(user_id, touches_history([deleted]))
+    publish_changes(user_id, "expenses", deleted_ids=[expense_id])
     return {"message": "Expense deleted successfully"}
 
 # Category Routes
 @api_router.get("/categories", response_model=List[Category])
-async def get_categories(user_id: str = Depends(get_current_user)):
-    categories = await db.categories.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-    for cat in categories:
-        if isinstance(cat['created_at'], str):
-            cat['created_at'] = datetime.fromisoformat(cat['created_at'])
-    return categories
+async def get_categories(request: Request, user_id: str = Depends(get_current_user)):
+    async def compute():
+        categories = await db.categories.find({"user_id": user_id}, CATEGORY_FIELDS).to_list(1000)
+        return project_docs(categories, CATEGORY_DEFAULTS)
+    return await cached_json_response(request, user_id, compute)
 
 @api_router.post("/categories", response_model=Category)
 async def create_category(category: CategoryCreate, user_id: str = Depends(get_current_user)):
@@ -328,63 +1506,153 @@ async def create_category(category: CategoryCreate, user_id: str = Depends(get_c
     cat_dict = new_category.model_dump()
     cat_dict['created_at'] = cat_dict['created_at'].isoformat()
     await db.categories.insert_one(cat_dict)
+    await bump_data_version(user_id)
+    publish_changes(user_id, "categories", upserted=[cat_dict])
     return new_category
 
 @api_router.delete("/categories/{category_id}")
 async def delete_category(category_id: str, user_id: str = Depends(get_current_user)):
-    category = await db.categories.find_one({"id": category_id, "user_id": user_id})
-    if not category:
+    # Documents without is_custom predate the flag and count as custom
+    deleted = await db.categories.find_one_and_delete(
+        {"id": category_id, "user_id": user_id, "is_custom": {"$ne": False}},
+        {"_id": 1}
+    )
+    if not deleted:
+        # Only a failed delete pays for telling a default category from a missing one
+        if await db.categories.find_one({"id": category_id, "user_id": user_id}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Cannot delete default categories")
         raise HTTPException(status_code=404, detail="Category not found")
-    if not category.get("is_custom", True):
-        raise HTTPException(status_code=400, detail="Cannot delete default categories")
-    
-    await db.categories.delete_one({"id": category_id})
+    await bump_data_version(user_id)
+    publish_changes(user_id, "categories", deleted_ids=[category_id])
     return {"message": "Category deleted successfully"}
 
 # Budget Routes
 @api_router.post("/budget", response_model=Budget)
 async def create_budget(budget: BudgetCreate, user_id: str = Depends(get_current_user)):
-    # Get user's currency
-    user = await db.users.find_one({"id": user_id})
-    currency = user.get("currency", "USD") if user else "USD"
-    
-    # Check if budget exists for this month
-    existing = await db.budgets.find_one({
-        "user_id": user_id,
-        "month": budget.month,
-        "year": budget.year
-    })
-    
-    if existing:
-        # Update existing budget
-        await db.budgets.update_one(
-            {"id": existing["id"]},
-            {"$set": {"limit": budget.limit, "currency": currency}}
+    currency = await get_user_currency(user_id)
+    query = {"user_id": user_id, "month": budget.month, "year": budget.year}
+    update = {
+        "$set": {"limit": budget.limit, "currency": currency},
+        "$inc": {"version": 1},
+        "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat()},
+    }
+    saved = None
+    if budget.version is not None:
+        # Checked without upserting, so a stale version can't insert a second budget for
+        # the month even where the unique (user_id, month, year) index is missing
+        saved = await db.budgets.find_one_and_update(
+            {**query, **version_condition(budget.version)},
+            update,
+            projection=BUDGET_FIELDS,
+            return_document=ReturnDocument.AFTER
         )
-        existing["limit"] = budget.limit
-        existing["currency"] = currency
-        if isinstance(existing['created_at'], str):
-            existing['created_at'] = datetime.fromisoformat(existing['created_at'])
-        return existing
-    
-    new_budget = Budget(user_id=user_id, currency=currency, **budget.model_dump())
-    budget_dict = new_budget.model_dump()
-    budget_dict['created_at'] = budget_dict['created_at'].isoformat()
-    await db.budgets.insert_one(budget_dict)
-    return new_budget
+        if saved is None and await db.budgets.find_one(query, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="Budget was changed elsewhere; reload it and try again")
+    if saved is None:
+        # One upsert creates the month's budget or updates it in place
+        try:
+            saved = await db.budgets.find_one_and_update(
+                query,
+                update,
+                projection=BUDGET_FIELDS,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another request created the month's budget first
+            raise HTTPException(status_code=409, detail="Budget was changed elsewhere; reload it and try again")
+    await bump_data_version(user_id)
+    publish_changes(user_id, "budgets", upserted=[saved])
+    return project_docs([saved], BUDGET_DEFAULTS)[0]
 
 @api_router.get("/budget/{month}/{year}", response_model=Budget)
-async def get_budget(month: int, year: int, user_id: str = Depends(get_current_user)):
-    budget = await db.budgets.find_one({
-        "user_id": user_id,
-        "month": month,
-        "year": year
-    }, {"_id": 0})
-    if not budget:
-        raise HTTPException(status_code=404, detail="Budget not found")
-    if isinstance(budget['created_at'], str):
-        budget['created_at'] = datetime.fromisoformat(budget['created_at'])
-    return budget
+async def get_budget(month: int, year: int, request: Request, user_id: str = Depends(get_current_user)):
+    async def compute():
+        budget = await db.budgets.find_one({
+            "user_id": user_id,
+            "month": month,
+            "year": year
+        }, BUDGET_FIELDS)
+        if not budget:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        return project_docs([budget], BUDGET_DEFAULTS)[0]
+    return await cached_json_response(request, user_id, compute)
+
+BUDGET_STATUS_MAX_MONTHS = 12
+
+def month_range(month: int, year: int, months: int) -> List[tuple]:
+    """(month, year) pairs for the `months` consecutive months starting at month/year."""
+    start = year * 12 + month - 1
+    return [((i % 12) + 1, i // 12) for i in range(start, start + months)]
+
+@api_router.get("/budget/{month}/{year}/status")
+async def get_budget_status(
+    request: Request,
+    month: int = PathParam(ge=1, le=12),
+    year: int = PathParam(ge=1, le=9999),
+    months: int = Query(1, ge=1, le=BUDGET_STATUS_MAX_MONTHS),
+    user_id: str = Depends(get_current_user)
+):
+    periods = month_range(month, year, months)
+    if periods[-1][1] > 9999:
+        # Month keys and dates only go up to year 9999
+        raise HTTPException(status_code=400, detail="Range ends after year 9999")
+    keys = [f"{y:04d}-{m:02d}" for m, y in periods]
+    today = datetime.now(timezone.utc).date()
+
+    async def compute():
+        # Both reads are index-backed and tiny: one budget row and a handful of rollup
+        # rows per month, instead of the user's raw expenses
+        budgets, spending = await asyncio.gather(
+            db.budgets.find(
+                {"user_id": user_id, "$or": [{"month": m, "year": y} for m, y in periods]},
+                {"_id": 0, "month": 1, "year": 1, "limit": 1}
+            ).to_list(months),
+            db.expense_rollups.aggregate([
+                {"$match": {"user_id": user_id, "month": {"$in": keys}}},
+                {"$facet": {
+                    "by_category": [{"$group": {"_id": "$category", "total": {"$sum": ROLLUP_CENTS}}}],
+                    "by_month": [{"$group": {"_id": "$month", "total": {"$sum": ROLLUP_CENTS}}}],
+                }}
+            ]).to_list(1)
+        )
+        facets = spending[0] if spending else {}
+        spent_by_month = {row["_id"]: row["total"] for row in facets.get("by_month", [])}
+        limits = {f"{b['year']:04d}-{b['month']:02d}": b["limit"] for b in budgets}
+
+        spent = sum(spent_by_month.values()) / 100
+        # The limit only covers budgeted months, so it is compared with their spending
+        # alone; spent still covers the whole period
+        limit = sum(limits.values()) if limits else None
+        budgeted_spent = sum(spent_by_month.get(key, 0) for key in limits) / 100
+
+        # Burn rate over the days of the period that have started
+        first_day = date(year, month, 1)
+        last_month, last_year = periods[-1]
+        last_day = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+        days_in_period = (last_day - first_day).days + 1
+        days_elapsed = max(0, min((today - first_day).days + 1, days_in_period))
+
+        return {
+            "month": month,
+            "year": year,
+            "months": months,
+            "limit": limit,
+            "spent": spent,
+            "budgeted_spent": budgeted_spent,
+            "remaining": round(limit - budgeted_spent, 2) if limit is not None else None,
+            "percent_used": round(budgeted_spent / limit * 100, 1) if limit else None,
+            "days_in_period": days_in_period,
+            "days_elapsed": days_elapsed,
+            "daily_burn_rate": round(spent / days_elapsed, 2) if days_elapsed else 0.0,
+            "by_category": {row["_id"]: row["total"] / 100 for row in facets.get("by_category", [])},
+            "by_month": {
+                key: {"limit": limits.get(key), "spent": spent_by_month.get(key, 0) / 100}
+                for key in keys
+            },
+        }
+    # days_elapsed moves with the calendar, not just with the user's data
+    return await cached_json_response(request, user_id, compute, vary=today.isoformat())
 
 # Recurring Expenses
 @api_router.post("/recurring", response_model=RecurringExpense)
@@ -393,167 +1661,1004 @@ async def create_recurring_expense(recurring: RecurringExpenseCreate, user_id: s
     recurring_dict = new_recurring.model_dump()
     recurring_dict['created_at'] = recurring_dict['created_at'].isoformat()
     await db.recurring_expenses.insert_one(recurring_dict)
+    await bump_data_version(user_id)
+    publish_changes(user_id, "recurring_expenses", upserted=[recurring_dict])
     return new_recurring
 
 @api_router.get("/recurring", response_model=List[RecurringExpense])
-async def get_recurring_expenses(user_id: str = Depends(get_current_user)):
-    recurring = await db.recurring_expenses.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-    for rec in recurring:
-        if isinstance(rec['created_at'], str):
-            rec['created_at'] = datetime.fromisoformat(rec['created_at'])
-    return recurring
+async def get_recurring_expenses(request: Request, user_id: str = Depends(get_current_user)):
+    async def compute():
+        recurring = await db.recurring_expenses.find({"user_id": user_id}, RECURRING_FIELDS).to_list(1000)
+        return project_docs(recurring, RECURRING_DEFAULTS)
+    return await cached_json_response(request, user_id, compute)
 
 @api_router.delete("/recurring/{recurring_id}")
 async def delete_recurring_expense(recurring_id: str, user_id: str = Depends(get_current_user)):
     result = await db.recurring_expenses.delete_one({"id": recurring_id, "user_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Recurring expense not found")
+    await bump_data_version(user_id)
+    publish_changes(user_id, "recurring_expenses", deleted_ids=[recurring_id])
     return {"message": "Recurring expense deleted successfully"}
 
+# Change feed
+def sse_message(event_id: str, event: dict) -> bytes:
+    return b"id: " + event_id.encode() + b"\nevent: change\ndata: " + orjson.dumps(event) + b"\n\n"
+
+@api_router.get("/changes")
+async def stream_changes(last_event_id: Optional[str] = Header(None), user_id: str = Depends(get_current_user)):
+    """Server-Sent Events: one change event per written or deleted expense, category,
+    budget or recurring item, with comment heartbeats in between."""
+    if change_feed.connections(user_id) >= change_feed.max_connections_per_user:
+        raise HTTPException(status_code=429, detail="Too many open change streams", headers={"Retry-After": "30"})
+
+    async def events():
+        # Subscribed here rather than above, since only a started generator is sure to
+        # reach its finally and unsubscribe
+        try:
+            subscription = change_feed.subscribe(user_id, last_event_id)
+        except TooManyConnections:
+            return  # lost a race for the last slot
+        deadline = time.monotonic() + CHANGE_FEED_MAX_STREAM_SECONDS
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                timeout = min(CHANGE_FEED_HEARTBEAT_SECONDS, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    event_id, event = await asyncio.wait_for(subscription.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield sse_message(event_id, event)
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # no-transform and X-Accel-Buffering keep proxies from compressing or buffering it
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+    )
+
+CHANGE_STREAM_PIPELINE = [{"$match": {
+    "ns.coll": {"$in": list(CHANGE_ENTITIES)},
+    "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+}}]
+
+async def enable_change_stream_pre_images():
+    # A delete event carries only the _id; the pre-image tells whose document it was
+    for collection in CHANGE_ENTITIES:
+        try:
+            await db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+        except PyMongoError as e:
+            logger.warning(f"Change feed will miss deletes from {collection}: {e}")
+
+def publish_stream_change(change: dict):
+    collection = change["ns"]["coll"]
+    event_id = change["_id"]["_data"]
+    if change["operationType"] == "delete":
+        doc = change.get("fullDocumentBeforeChange")
+        if doc and doc.get("user_id"):
+            change_feed.publish(doc["user_id"], change_event(collection, deleted_id=doc.get("id")), event_id)
+        return
+    # None when the document was deleted before the lookup; its delete event follows
+    doc = change.get("fullDocument")
+    if doc and doc.get("user_id"):
+        change_feed.publish(doc["user_id"], change_event(collection, doc), event_id)
+
+# Errors meaning this deployment can't run the stream at all (standalone server, or a
+# MongoDB too old for the pipeline or pre-image options); retrying won't help
+CHANGE_STREAM_UNSUPPORTED_CODES = {
+    40573,  # $changeStream is only supported on replica sets
+    40324,  # unrecognized pipeline stage
+    40415,  # unknown field, e.g. fullDocumentBeforeChange before 6.0
+    115,  # CommandNotSupported
+}
+CHANGE_STREAM_MAX_BACKOFF_SECONDS = 60
+
+async def run_change_stream():
+    global CHANGE_FEED_SOURCE
+    resume_after = None
+    backoff = 1
+    # Set when events may have been missed. Clients are reset once the next stream is
+    # open, not on every failed attempt, so their refetch can't miss anything either.
+    missed = False
+    while True:
+        try:
+            async with db.watch(
+                CHANGE_STREAM_PIPELINE,
+                full_document="updateLookup",
+                full_document_before_change="whenAvailable",
+                resume_after=resume_after
+            ) as stream:
+                backoff = 1
+                if missed:
+                    change_feed.reset_all()
+                    missed = False
+                async for change in stream:
+                    publish_stream_change(change)
+                    resume_after = stream.resume_token
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                logger.error(f"Change streams are not supported here, publishing local writes instead: {e}")
+                CHANGE_FEED_SOURCE = "local"
+                change_feed.reset_all()
+                return
+            # Typically the oplog moved past our resume token: start from now and have
+            # every client refetch what it may have missed
+            logger.error(f"Change stream failed, restarting in {backoff}s: {e}")
+            resume_after = None
+            missed = True
+        except Exception:
+            logger.exception(f"Change stream interrupted, resuming in {backoff}s")
+            # Without a resume token the next stream starts from now
+            missed = missed or resume_after is None
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, CHANGE_STREAM_MAX_BACKOFF_SECONDS)
+
+# Recurring expense scheduler
+# Turns due recurring items into real expenses. Every worker runs the loop, but only the
+# holder of the lease document does any work. Generated expenses carry the import_key
+# "recurring:<id>:<date>", so if a run dies before advancing next_date, the rerun's
+# duplicate inserts are rejected by the unique index and nothing is counted twice.
+RECURRING_SCHEDULER_ENABLED = os.environ.get("RECURRING_SCHEDULER", "true").lower() in ("1", "true", "yes")
+RECURRING_INTERVAL_SECONDS = int(os.environ.get("RECURRING_INTERVAL_SECONDS", "60"))
+RECURRING_BATCH_SIZE = 500
+# Bounds the catch-up after downtime: occurrences per item and batches per pass; the
+# remainder is picked up on the next tick instead of in one burst
+RECURRING_MAX_OCCURRENCES = 31
+RECURRING_MAX_BATCHES = 20
+RECURRING_LEASE_SECONDS = RECURRING_INTERVAL_SECONDS * 3
+RECURRING_FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+scheduler_owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def next_occurrence(current: date, frequency: str) -> date:
+    if frequency == "daily":
+        return current + timedelta(days=1)
+    if frequency == "weekly":
+        return current + timedelta(weeks=1)
+    if frequency == "monthly":
+        year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+    else:
+        year, month = current.year + 1, current.month
+    # Clamp e.g. Jan 31 -> Feb 28 and Feb 29 -> Feb 28
+    return current.replace(year=year, month=month, day=min(current.day, calendar.monthrange(year, month)[1]))
+
+async def acquire_scheduler_lease(name: str) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        await db.scheduler_leases.update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": scheduler_owner}]},
+            {"$set": {"owner": scheduler_owner, "expires_at": now + timedelta(seconds=RECURRING_LEASE_SECONDS)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Lease exists and another live worker holds it
+        return False
+    return True
+
+async def materialize_recurring_expenses(today: Optional[date] = None) -> int:
+    """Insert the expenses for recurring items due on or before today; returns how many."""
+    # The UTC date, like the rest of the stored dates, whatever the server's timezone
+    today_str = (today or datetime.now(timezone.utc).date()).isoformat()
+    created_total = 0
+    for _ in range(RECURRING_MAX_BATCHES):
+        due = await db.recurring_expenses.find(
+            {"is_active": True, "next_date": {"$lte": today_str}, "frequency": {"$in": list(RECURRING_FREQUENCIES)}},
+            {"_id": 0}
+        ).sort("next_date", 1).limit(RECURRING_BATCH_SIZE).to_list(RECURRING_BATCH_SIZE)
+        if not due:
+            break
+
+        created_at = datetime.now(timezone.utc)
+        docs, advances, advanced_by_user = [], [], {}
+        for rec in due:
+            try:
+                occurrence = date.fromisoformat(rec["next_date"][:10])
+            except ValueError:
+                # Paused rather than skipped, or it would head every batch and stall the rest
+                logger.warning(f"Pausing recurring expense {rec['id']} with invalid next_date {rec['next_date']!r}")
+                advances.append(UpdateOne(
+                    {"id": rec["id"], "next_date": rec["next_date"]},
+                    {"$set": {"is_active": False}}
+                ))
+                advanced_by_user.setdefault(rec["user_id"], []).append({**rec, "is_active": False})
+                continue
+            for _ in range(RECURRING_MAX_OCCURRENCES):
+                if occurrence.isoformat() > today_str:
+                    break
+                docs.append(encode_expense({
+                    "id": str(uuid.uuid4()),
+                    "user_id": rec["user_id"],
+                    "category": rec["category"],
+                    "amount": rec["amount"],
+                    "date": occurrence.isoformat(),
+                    "payment_method": rec["payment_method"],
+                    "notes": rec.get("notes", ""),
+                    "receipt_url": "",
+                    "version": 1,
+                    "created_at": created_at,
+                    "recurring_id": rec["id"],
+                    "import_key": f"recurring:{rec['id']}:{occurrence.isoformat()}",
+                }))
+                occurrence = next_occurrence(occurrence, rec["frequency"])
+            advances.append(UpdateOne(
+                # Conditional on the value we read so a stale run can't move it twice
+                {"id": rec["id"], "next_date": rec["next_date"]},
+                {"$set": {"next_date": occurrence.isoformat()}}
+            ))
+            advanced_by_user.setdefault(rec["user_id"], []).append({**rec, "next_date": occurrence.isoformat()})
+        if not advances:
+            break
+
+        failed = set()
+        if docs:
+            try:
+                await db.expenses.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details["writeErrors"] if err["code"] == 11000}
+                if len(failed) < len(e.details["writeErrors"]):
+                    raise
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+        await apply_rollup_deltas(inserted)
+        await db.recurring_expenses.bulk_write(advances, ordered=False)
+        inserted_by_user = {}
+        for doc in inserted:
+            inserted_by_user.setdefault(doc["user_id"], []).append(doc)
+        for affected_user, user_docs in inserted_by_user.items():
+            update_expense_caches(affected_user, added=user_docs)
+        # Advancing next_date changes /recurring output even when every insert was a duplicate
+        backdated = {doc["user_id"] for doc in inserted if touches_history([doc])}
+        for affected_user in {rec["user_id"] for rec in due}:
+            await bump_data_version(affected_user, affected_user in backdated)
+            publish_changes(affected_user, "expenses", upserted=inserted_by_user.get(affected_user, []))
+            publish_changes(affected_user, "recurring_expenses", upserted=advanced_by_user.get(affected_user, []))
+        created_total += len(inserted)
+
+        if len(due) < RECURRING_BATCH_SIZE:
+            break
+        # Renew the lease between batches of a long catch-up and yield to requests
+        await acquire_scheduler_lease("recurring_expenses")
+        await asyncio.sleep(0.1)
+    return created_total
+
+async def run_recurring_scheduler():
+    while True:
+        # Jitter keeps several workers from polling the lease in lockstep
+        await asyncio.sleep(RECURRING_INTERVAL_SECONDS * random.uniform(0.5, 1.0))
+        try:
+            if await acquire_scheduler_lease("recurring_expenses"):
+                created = await materialize_recurring_expenses()
+                if created:
+                    logger.info(f"Recurring scheduler created {created} expenses")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Recurring scheduler pass failed")
+
 # Dashboard Stats
+DASHBOARD_TREND_MONTHS = 6
+
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(user_id: str = Depends(get_current_user)):
-    expenses = await db.expenses.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-    
-    total_expenses = sum(exp["amount"] for exp in expenses)
-    
-    # Calculate by category
-    by_category = {}
-    for exp in expenses:
-        cat = exp["category"]
-        by_category[cat] = by_category.get(cat, 0) + exp["amount"]
-    
-    # Calculate by payment method
-    by_payment = {}
-    for exp in expenses:
-        method = exp["payment_method"]
-        by_payment[method] = by_payment.get(method, 0) + exp["amount"]
-    
-    # Calculate monthly trend (last 6 months)
-    monthly_trend = {}
-    for exp in expenses:
-        date_str = exp["date"]
-        month_key = date_str[:7]  # YYYY-MM
-        monthly_trend[month_key] = monthly_trend.get(month_key, 0) + exp["amount"]
-    
-    return {
-        "total_expenses": total_expenses,
-        "by_category": by_category,
-        "by_payment_method": by_payment,
-        "monthly_trend": monthly_trend,
-        "total_transactions": len(expenses)
-    }
+async def get_dashboard_stats(request: Request, user_id: str = Depends(get_current_user)):
+    # monthly_trend covers the last DASHBOARD_TREND_MONTHS months including this one;
+    # longer or finer series come from /reports/timeseries
+    today = datetime.now(timezone.utc).date()
+    start = today.year * 12 + today.month - DASHBOARD_TREND_MONTHS
+    trend_start = f"{start // 12:04d}-{start % 12 + 1:02d}"
+
+    async def compute():
+        # Rollup rows are already grouped per month/category/method, so each facet only
+        # re-groups a few dozen pre-aggregated rows instead of the user's raw expenses
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$facet": {
+                "totals": [
+                    {"$group": {"_id": None, "total": {"$sum": ROLLUP_CENTS}, "count": {"$sum": "$count"}}}
+                ],
+                "by_category": [
+                    {"$group": {"_id": "$category", "total": {"$sum": ROLLUP_CENTS}}}
+                ],
+                "by_payment_method": [
+                    {"$group": {"_id": "$payment_method", "total": {"$sum": ROLLUP_CENTS}}}
+                ],
+                "monthly_trend": [
+                    {"$match": {"month": {"$gte": trend_start}}},
+                    {"$group": {"_id": "$month", "total": {"$sum": ROLLUP_CENTS}}},
+                    {"$sort": {"_id": 1}}
+                ],
+            }}
+        ]
+        result = await db.expense_rollups.aggregate(pipeline).to_list(1)
+        facets = result[0] if result else {}
+
+        totals = facets.get("totals") or [{"total": 0, "count": 0}]
+
+        # Sums are exact integer cents; convert once at the edge
+        return {
+            "total_expenses": totals[0]["total"] / 100,
+            "by_category": {row["_id"]: row["total"] / 100 for row in facets.get("by_category", [])},
+            "by_payment_method": {row["_id"]: row["total"] / 100 for row in facets.get("by_payment_method", [])},
+            "monthly_trend": {row["_id"]: row["total"] / 100 for row in facets.get("monthly_trend", [])},
+            "total_transactions": totals[0]["count"]
+        }
+    return await cached_json_response(request, user_id, compute, vary=trend_start)
+
+# Reports
+REPORT_INTERVALS = ("day", "week", "month", "year")
+REPORT_SPLITS = ("category", "payment_method")
+REPORT_DEFAULT_BUCKETS = 12
+REPORT_MAX_BUCKETS = 1000
+
+def bucket_start(day: date, interval: str) -> date:
+    # Matches $dateTrunc with startOfWeek "monday"
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    if interval == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+def next_bucket(start: date, interval: str) -> date:
+    if interval == "week":
+        return start + timedelta(days=7)
+    if interval == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if interval == "year":
+        return date(start.year + 1, 1, 1)
+    return start + timedelta(days=1)
+
+# Closed buckets (ended before today and wholly inside the requested range) can only
+# change through a backdated expense write, so they are memoized per process keyed by
+# the user's history_version; only the current bucket and partial edge buckets are
+# re-aggregated after an ordinary write.
+REPORT_CACHE_MAX_BUCKETS = int(os.environ.get("REPORT_CACHE_MAX_BUCKETS", "200000"))
+report_buckets = OrderedDict()  # (user_id, history_version, interval, split_by, start) -> bucket
+
+def recall_report_bucket(key: tuple) -> Optional[dict]:
+    bucket = report_buckets.get(key)
+    if bucket is not None:
+        # Least recently used goes first, so buckets still being read aren't evicted
+        report_buckets.move_to_end(key)
+    return bucket
+
+def remember_report_bucket(key: tuple, bucket: dict):
+    report_buckets[key] = bucket
+    report_buckets.move_to_end(key)
+    while len(report_buckets) > REPORT_CACHE_MAX_BUCKETS:
+        report_buckets.popitem(last=False)
+
+# Day of an expense in either storage format, as a BSON date
+EXPENSE_DATE = {"$cond": [
+    {"$eq": [{"$type": "$date"}, "date"]},
+    "$date",
+    {"$dateFromString": {"dateString": {"$substrBytes": ["$date", 0, 10]}}},
+]}
+EXPENSE_CENTS = {"$ifNull": ["$amount_cents", {"$toLong": {"$round": [{"$multiply": ["$amount", 100]}, 0]}}]}
+
+async def aggregate_report_buckets(user_id: str, interval: str, split_by: Optional[str], first: date, last: date) -> dict:
+    """Sum expenses dated first..last (inclusive) into {bucket start: bucket}."""
+    trunc = {"date": EXPENSE_DATE, "unit": interval}
+    if interval == "week":
+        trunc["startOfWeek"] = "monday"
+    group_id = {"bucket": {"$dateTrunc": trunc}}
+    if split_by:
+        group_id["key"] = f"${split_by}"
+    rows = await db.expenses.aggregate([
+        {"$match": expense_query(user_id, first.isoformat(), last.isoformat())},
+        {"$group": {"_id": group_id, "total": {"$sum": EXPENSE_CENTS}, "count": {"$sum": 1}}},
+    ]).to_list(None)
+
+    buckets = {}
+    for row in rows:
+        start = row["_id"]["bucket"].date()
+        bucket = buckets.setdefault(start, {"total": 0, "count": 0, "by": {}})
+        bucket["total"] += row["total"]
+        bucket["count"] += row["count"]
+        if split_by:
+            key = row["_id"].get("key") or "Other"
+            bucket["by"][key] = bucket["by"].get(key, 0) + row["total"]
+    return buckets
+
+@api_router.get("/reports/timeseries")
+async def get_report_timeseries(
+    request: Request,
+    interval: str = "month",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    split_by: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    if interval not in REPORT_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(REPORT_INTERVALS)}")
+    if split_by is not None and split_by not in REPORT_SPLITS:
+        raise HTTPException(status_code=400, detail=f"split_by must be one of {', '.join(REPORT_SPLITS)}")
+    today = datetime.now(timezone.utc).date()
+    last = date.fromisoformat(parse_date_param(date_to)) if date_to else today
+    if date_from:
+        first = date.fromisoformat(parse_date_param(date_from))
+    else:
+        first = bucket_start(last, interval)
+        for _ in range(REPORT_DEFAULT_BUCKETS - 1):
+            first = bucket_start(first - timedelta(days=1), interval)
+    if first > last:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+
+    starts = [bucket_start(first, interval)]
+    while next_bucket(starts[-1], interval) <= last:
+        if len(starts) >= REPORT_MAX_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Range spans more than {REPORT_MAX_BUCKETS} buckets")
+        starts.append(next_bucket(starts[-1], interval))
+
+    async def compute():
+        history_version = await get_history_version(user_id)
+        closed = [
+            start for start in starts
+            if start >= first and next_bucket(start, interval) <= min(today, last + timedelta(days=1))
+        ]
+        keys = {start: (user_id, history_version, interval, split_by, start) for start in closed}
+        memo = {start: recall_report_bucket(key) for start, key in keys.items()}
+
+        if closed and all(bucket is not None for bucket in memo.values()):
+            # Only the open edges of the range still need aggregating
+            ranges = []
+            if first < closed[0]:
+                ranges.append((first, closed[0] - timedelta(days=1)))
+            if next_bucket(closed[-1], interval) <= last:
+                ranges.append((next_bucket(closed[-1], interval), last))
+            buckets = dict(memo)
+        else:
+            ranges = [(first, last)]
+            buckets = {}
+        for part in await asyncio.gather(*(
+            aggregate_report_buckets(user_id, interval, split_by, lo, hi) for lo, hi in ranges
+        )):
+            buckets.update(part)
+        for start, key in keys.items():
+            if memo[start] is None:
+                remember_report_bucket(key, buckets.get(start, {"total": 0, "count": 0, "by": {}}))
+
+        series = []
+        for start in starts:
+            bucket = buckets.get(start) or {"total": 0, "count": 0, "by": {}}
+            point = {"start": start.isoformat(), "total": bucket["total"] / 100, "count": bucket["count"]}
+            if split_by:
+                point["by"] = {key: cents / 100 for key, cents in bucket["by"].items()}
+            series.append(point)
+        return {
+            "interval": interval,
+            "date_from": first.isoformat(),
+            "date_to": last.isoformat(),
+            "split_by": split_by,
+            "series": series,
+        }
+    # Which buckets are closed moves with the calendar, not just with the user's data
+    return await cached_json_response(request, user_id, compute, vary=today.isoformat())
 
 # Export Routes
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["date", "category", "amount", "payment_method", "notes"]
+EXPORT_PROJECTION = {"_id": 0, "amount_cents": 1, **{field: 1 for field in EXPORT_FIELDS}}
+
+async def export_batches(user_id: str, date_from: Optional[str], date_to: Optional[str], category: Optional[str]):
+    """Yield the filtered expenses in date order as lists of export-shaped dicts."""
+    table = await cached_expense_table(user_id)
+    if table is not None:
+        rows = table.select(
+            analytics.day_number(date.fromisoformat(parse_date_param(date_from))) if date_from else None,
+            analytics.day_number(date.fromisoformat(parse_date_param(date_to))) if date_to else None,
+            category,
+        )
+        for batch in table.export_batches(rows, EXPORT_BATCH_SIZE):
+            yield batch
+        return
+
+    cursor = db.expenses.find(
+        expense_query(user_id, date_from, date_to, category),
+        EXPORT_PROJECTION,
+        batch_size=EXPORT_BATCH_SIZE
+    ).sort("date", 1)
+    while True:
+        batch = await cursor.to_list(EXPORT_BATCH_SIZE)
+        if not batch:
+            break
+        for exp in batch:
+            decode_expense(exp).setdefault("notes", "")
+        yield batch
+
 @api_router.get("/export/csv")
-async def export_csv(user_id: str = Depends(get_current_user)):
-    expenses = await db.expenses.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-    
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=["date", "category", "amount", "payment_method", "notes"])
-    writer.writeheader()
-    
-    for exp in expenses:
-        writer.writerow({
-            "date": exp["date"],
-            "category": exp["category"],
-            "amount": exp["amount"],
-            "payment_method": exp["payment_method"],
-            "notes": exp.get("notes", "")
-        })
-    
-    output.seek(0)
+async def export_csv(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    # Checked before the response starts so a bad filter is still a 400
+    for value in (date_from, date_to):
+        if value:
+            parse_date_param(value)
+
+    async def generate():
+        # The header goes out before any rows are read; only one batch is ever buffered
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        yield output.getvalue()
+
+        async for batch in export_batches(user_id, date_from, date_to, category):
+            output.seek(0)
+            output.truncate()
+            writer.writerows(batch)
+            yield output.getvalue()
+
     return StreamingResponse(
-        iter([output.getvalue()]),
+        generate(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=expenses.csv"}
     )
 
-@api_router.get("/export/excel")
-async def export_excel(user_id: str = Depends(get_current_user)):
-    expenses = await db.expenses.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Expenses"
-    
-    # Headers
+# Spreadsheet building is CPU-bound and synchronous, so it runs on a small dedicated
+# pool instead of the event loop; EXPORT_WORKERS caps how many run at once
+export_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("EXPORT_WORKERS", "2")),
+    thread_name_prefix="export"
+)
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def excel_date(value: str):
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return value
+
+# openpyxl is imported on first use (see new_excel_workbook), like reportlab in
+# pdf_report.py, so workers that never export don't pay for loading it at startup
+def new_excel_workbook():
+    from openpyxl import Workbook
+    # Write-only mode spools rows to a temp file instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Expenses")
     ws.append(["Date", "Category", "Amount", "Payment Method", "Notes"])
-    
-    # Data
+    return wb, ws
+
+def append_excel_rows(ws, expenses: List[dict]):
+    from openpyxl.cell import WriteOnlyCell
     for exp in expenses:
+        date_cell = WriteOnlyCell(ws, value=excel_date(exp["date"]))
+        date_cell.number_format = "yyyy-mm-dd"
+        amount_cell = WriteOnlyCell(ws, value=float(exp["amount"]))
+        amount_cell.number_format = "#,##0.00"
         ws.append([
-            exp["date"],
+            date_cell,
             exp["category"],
-            exp["amount"],
+            amount_cell,
             exp["payment_method"],
             exp.get("notes", "")
         ])
-    
-    output = io.BytesIO()
+
+def save_excel_workbook(wb):
+    output = tempfile.TemporaryFile()
     wb.save(output)
     output.seek(0)
-    
+    return output
+
+async def stream_file(output):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(export_executor, output.read, EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        output.close()
+
+async def build_excel_file(user_id: str, date_from: Optional[str], date_to: Optional[str], category: Optional[str]):
+    """Build the workbook into a temp file, rewound and ready to read."""
+    loop = asyncio.get_running_loop()
+    wb, ws = await loop.run_in_executor(export_executor, new_excel_workbook)
+    async for batch in export_batches(user_id, date_from, date_to, category):
+        await loop.run_in_executor(export_executor, append_excel_rows, ws, batch)
+    return await loop.run_in_executor(export_executor, save_excel_workbook, wb)
+
+@api_router.get("/export/excel")
+async def export_excel(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    output = await build_excel_file(user_id, date_from, date_to, category)
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_file(output),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": "attachment; filename=expenses.xlsx"}
     )
 
+# PDF rendering is pure CPU work, so it runs in worker processes. The semaphore bounds
+# how many reports are being read or rendered at once (each holds its rows in memory).
+# Workers come from a fork server (spawn where that's unavailable) rather than a fork of
+# this process, so they start with only pdf_report loaded, not the app and its Mongo client.
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+PDF_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+pdf_executor = ProcessPoolExecutor(
+    max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context(PDF_START_METHOD)
+)
+pdf_semaphore = asyncio.Semaphore(int(os.environ.get("PDF_MAX_CONCURRENT", str(PDF_WORKERS))))
+
+pdf_cache = BytesLRUCache(int(os.environ.get("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+async def build_pdf(user_id: str, username: str, date_from: Optional[str], date_to: Optional[str], category: Optional[str]) -> bytes:
+    async with pdf_semaphore:
+        # Rows are read under the semaphore too, so waiting requests don't hold theirs
+        rows = []
+        async for batch in export_batches(user_id, date_from, date_to, category):
+            rows.extend((exp["date"], exp["category"], exp["amount"], exp["payment_method"]) for exp in batch)
+        return await asyncio.get_running_loop().run_in_executor(
+            pdf_executor, render_expense_report, username, rows
+        )
+
 @api_router.get("/export/pdf")
-async def export_pdf(user_id: str = Depends(get_current_user)):
-    expenses = await db.expenses.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
-    user = await db.users.find_one({"id": user_id})
-    
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Title
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, height - 50, f"Expense Report - {user.get('username', 'User')}")
-    
-    # Headers
-    y = height - 100
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(50, y, "Date")
-    p.drawString(150, y, "Category")
-    p.drawString(250, y, "Amount")
-    p.drawString(350, y, "Payment")
-    
-    # Data
-    p.setFont("Helvetica", 9)
-    y -= 20
-    
-    for exp in expenses:
-        if y < 50:
-            p.showPage()
-            y = height - 50
-            p.setFont("Helvetica", 9)
-        
-        p.drawString(50, y, exp["date"][:10])
-        p.drawString(150, y, exp["category"][:15])
-        p.drawString(250, y, f"${exp['amount']:.2f}")
-        p.drawString(350, y, exp["payment_method"][:15])
-        y -= 15
-    
-    # Total
-    total = sum(exp["amount"] for exp in expenses)
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(250, y - 20, f"Total: ${total:.2f}")
-    
-    p.save()
-    buffer.seek(0)
-    
+async def export_pdf(
+    request: Request,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "username": 1, "data_version": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # The report is fully determined by the user's data version and the filters, so the
+    # key doubles as a strong ETag and repeat downloads need neither a query nor a render
+    key = hashlib.sha256(json.dumps(
+        [user_id, user.get("data_version", 0), date_from, date_to, category]
+    ).encode()).hexdigest()
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": "attachment; filename=expenses.pdf"
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    content = pdf_cache.get(key)
+    if content is None:
+        content = await build_pdf(user_id, user.get("username", "User"), date_from, date_to, category)
+        pdf_cache.put(key, content)
+
+    return Response(content=content, media_type="application/pdf", headers=headers)
+
+# Export jobs
+# POST /export/jobs queues an export and returns at once; EXPORT_JOB_WORKERS tasks per
+# process claim queued jobs from Mongo, render them with the same builders as the
+# synchronous routes and store the result in the "exports" GridFS bucket. Results and
+# job documents expire after EXPORT_JOB_TTL_SECONDS (the job by TTL index, the file by
+# the sweeper, since GridFS files can't carry a TTL index across both collections).
+EXPORT_JOB_WORKERS = int(os.environ.get("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOBS_PER_USER = int(os.environ.get("EXPORT_JOBS_PER_USER", "2"))
+EXPORT_JOB_TTL_SECONDS = int(os.environ.get("EXPORT_JOB_TTL_SECONDS", str(24 * 3600)))
+EXPORT_JOB_TIMEOUT_SECONDS = int(os.environ.get("EXPORT_JOB_TIMEOUT_SECONDS", "900"))
+EXPORT_JOB_POLL_SECONDS = 2.0
+EXPORT_JOB_SWEEP_SECONDS = 300
+EXPORT_JOB_FIELDS = response_fields(ExportJob)
+EXPORT_MEDIA_TYPES = {
+    "csv": ("text/csv", "csv"),
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "pdf": ("application/pdf", "pdf"),
+}
+
+export_files: Optional[AsyncIOMotorGridFSBucket] = None  # set by connect_mongo
+export_job_wakeup = asyncio.Event()
+
+async def build_csv_file(user_id: str, date_from: Optional[str], date_to: Optional[str], category: Optional[str]):
+    output = tempfile.TemporaryFile()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    async for batch in export_batches(user_id, date_from, date_to, category):
+        writer.writerows(batch)
+        output.write(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+    output.write(buffer.getvalue().encode())
+    output.seek(0)
+    return output
+
+async def render_export_job(job: dict):
+    """Render a claimed job into a rewound file object."""
+    args = (job["user_id"], job.get("date_from"), job.get("date_to"), job.get("category"))
+    if job["format"] == "csv":
+        return await build_csv_file(*args)
+    if job["format"] == "excel":
+        return await build_excel_file(*args)
+    user = await db.users.find_one({"id": job["user_id"]}, {"_id": 0, "username": 1})
+    return io.BytesIO(await build_pdf(args[0], (user or {}).get("username", "User"), *args[1:]))
+
+async def claim_export_job() -> Optional[dict]:
+    return await db.export_jobs.find_one_and_update(
+        {"status": "queued"},
+        {"$set": {"status": "running", "started_at": datetime.now(timezone.utc), "worker": socket.gethostname()}},
+        projection={"_id": 0},
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def store_export_file(job: dict, output) -> None:
+    """Upload a rendered job's file to GridFS and mark the job done."""
+    finished_at = datetime.now(timezone.utc)
+    expires_at = finished_at + timedelta(seconds=EXPORT_JOB_TTL_SECONDS)
+    output.seek(0, io.SEEK_END)
+    size = output.tell()
+    output.seek(0)
+    extension = EXPORT_MEDIA_TYPES[job["format"]][1]
+    file_id = await export_files.upload_from_stream(
+        f"expenses-{job['id']}.{extension}",
+        output,
+        metadata={"user_id": job["user_id"], "job_id": job["id"], "expires_at": expires_at}
+    )
+    await db.export_jobs.update_one(
+        {"id": job["id"]},
+        {"$set": {
+            "status": "done",
+            "file_id": file_id,
+            "size": size,
+            "finished_at": finished_at,
+            "expires_at": expires_at,
+        }, "$unset": {"slot": ""}}
+    )
+
+async def process_export_job(job: dict):
+    # Any failure, including the upload or the final update, fails the job and frees its
+    # slot now rather than at the timeout sweep
+    try:
+        output = await render_export_job(job)
+        try:
+            await store_export_file(job, output)
+        finally:
+            output.close()
+    except Exception as e:
+        logger.exception(f"Export job {job['id']} failed")
+        await db.export_jobs.update_one(
+            # Unless the done update went through after all
+            {"id": job["id"], "status": "running"},
+            {
+                "$set": {"status": "failed", "error": str(e) or type(e).__name__, "finished_at": datetime.now(timezone.utc)},
+                "$unset": {"slot": ""},
+            }
+        )
+
+async def run_export_worker():
+    while True:
+        try:
+            job = await claim_export_job()
+            if job is None:
+                try:
+                    await asyncio.wait_for(export_job_wakeup.wait(), EXPORT_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                export_job_wakeup.clear()
+                continue
+            await process_export_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Export worker iteration failed")
+            await asyncio.sleep(EXPORT_JOB_POLL_SECONDS)
+
+async def sweep_export_jobs():
+    """Fail jobs whose worker died mid-render and delete result files past their expiry."""
+    now = datetime.now(timezone.utc)
+    await db.export_jobs.update_many(
+        {"status": "running", "started_at": {"$lt": now - timedelta(seconds=EXPORT_JOB_TIMEOUT_SECONDS)}},
+        {"$set": {"status": "failed", "error": "Export timed out", "finished_at": now}, "$unset": {"slot": ""}}
+    )
+    async for stale in db["exports.files"].find({"metadata.expires_at": {"$lt": now}}, {"_id": 1}):
+        try:
+            await export_files.delete(stale["_id"])
+        except gridfs_errors.NoFile:
+            pass  # another worker's sweep got there first
+
+async def run_export_sweeper():
+    while True:
+        try:
+            await sweep_export_jobs()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Export sweep failed")
+        await asyncio.sleep(EXPORT_JOB_SWEEP_SECONDS)
+
+@api_router.post("/export/jobs", response_model=ExportJob, status_code=202)
+async def create_export_job(job: ExportJobCreate, user_id: str = Depends(get_current_user)):
+    # Normalized up front so a bad filter is a 400 now rather than a failed job later
+    date_from = parse_date_param(job.date_from) if job.date_from else None
+    date_to = parse_date_param(job.date_to) if job.date_to else None
+    created_at = datetime.now(timezone.utc)
+    doc = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "format": job.format,
+        "status": "queued",
+        "date_from": date_from,
+        "date_to": date_to,
+        "category": job.category,
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(seconds=EXPORT_JOB_TTL_SECONDS),
+    }
+    # Taking a free slot and queueing the job is one insert, so concurrent requests can't
+    # get past the limit between a count and an insert; a finished job gives its slot up
+    for slot in range(EXPORT_JOBS_PER_USER):
+        try:
+            await db.export_jobs.insert_one({**doc, "slot": slot})
+            break
+        except DuplicateKeyError:
+            continue
+    else:
+        raise HTTPException(
+            status_code=429,
+            detail=f"At most {EXPORT_JOBS_PER_USER} exports can be pending at once",
+            headers={"Retry-After": "10"}
+        )
+    export_job_wakeup.set()
+    return doc
+
+@api_router.get("/export/jobs", response_model=List[ExportJob])
+async def list_export_jobs(user_id: str = Depends(get_current_user)):
+    return await db.export_jobs.find({"user_id": user_id}, EXPORT_JOB_FIELDS).sort("created_at", -1).to_list(50)
+
+@api_router.get("/export/jobs/{job_id}", response_model=ExportJob)
+async def get_export_job(job_id: str, user_id: str = Depends(get_current_user)):
+    job = await db.export_jobs.find_one({"id": job_id, "user_id": user_id}, EXPORT_JOB_FIELDS)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@api_router.get("/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, user_id: str = Depends(get_current_user)):
+    job = await db.export_jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    try:
+        stream = await export_files.open_download_stream(job["file_id"])
+    except gridfs_errors.NoFile:
+        raise HTTPException(status_code=410, detail="Export has expired")
+
+    async def chunks():
+        while True:
+            chunk = await stream.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    media_type, extension = EXPORT_MEDIA_TYPES[job["format"]]
     return StreamingResponse(
-        iter([buffer.getvalue()]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=expenses.pdf"}
+        chunks(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=expenses.{extension}",
+            "Content-Length": str(job["size"]),
+        }
     )
 
+# Analytics
+# The user's expenses are read once into numpy columns (see analytics.py) and the
+# statistic is computed on a small thread pool; numpy releases the GIL for the heavy
+# array work, so this stays off the event loop without the cost of worker processes.
+analytics_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ANALYTICS_WORKERS", "2")),
+    thread_name_prefix="analytics"
+)
+ANALYTICS_PROJECTION = {"_id": 0, "id": 1, "date": 1, "amount_cents": 1, "amount": 1, "category": 1}
+
+async def load_expense_columns(user_id: str) -> analytics.ExpenseColumns:
+    table = await cached_expense_table(user_id)
+    if table is not None:
+        return table.analytics_columns()
+    ids, days, cents, categories = [], [], [], []
+    cursor = db.expenses.find({"user_id": user_id}, ANALYTICS_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        try:
+            day = expense_day(doc)
+        except ValueError:
+            continue  # unmigrated row with an unreadable date
+        ids.append(doc["id"])
+        days.append(day.toordinal() - analytics.EPOCH_ORDINAL)
+        cents.append(expense_cents(doc))
+        categories.append(doc.get("category") or "Other")
+    return await asyncio.get_running_loop().run_in_executor(
+        analytics_executor, analytics.ExpenseColumns.from_lists, ids, days, cents, categories
+    )
+
+async def analytics_response(request: Request, user_id: str, fn, *args):
+    async def compute():
+        columns = await load_expense_columns(user_id)
+        return await asyncio.get_running_loop().run_in_executor(analytics_executor, fn, columns, *args)
+    # Rolling windows, month-over-month and the forecast are all relative to today
+    return await cached_json_response(request, user_id, compute, vary=datetime.now(timezone.utc).date().isoformat())
+
+@api_router.get("/analytics/percentiles")
+async def get_analytics_percentiles(request: Request, user_id: str = Depends(get_current_user)):
+    return await analytics_response(request, user_id, analytics.category_percentiles)
+
+@api_router.get("/analytics/rolling")
+async def get_analytics_rolling(
+    request: Request,
+    days: int = Query(90, ge=1, le=730),
+    user_id: str = Depends(get_current_user)
+):
+    today = datetime.now(timezone.utc).date()
+    return await analytics_response(request, user_id, analytics.rolling_averages, today, days)
+
+@api_router.get("/analytics/monthly")
+async def get_analytics_monthly(
+    request: Request,
+    months: int = Query(12, ge=1, le=120),
+    user_id: str = Depends(get_current_user)
+):
+    today = datetime.now(timezone.utc).date()
+    return await analytics_response(request, user_id, analytics.month_over_month, today, months)
+
+@api_router.get("/analytics/outliers")
+async def get_analytics_outliers(
+    request: Request,
+    threshold: float = Query(3.5, gt=0),
+    limit: int = Query(20, ge=1, le=200),
+    user_id: str = Depends(get_current_user)
+):
+    return await analytics_response(request, user_id, analytics.outliers, threshold, limit)
+
+@api_router.get("/analytics/forecast")
+async def get_analytics_forecast(request: Request, user_id: str = Depends(get_current_user)):
+    today = datetime.now(timezone.utc).date()
+    return await analytics_response(request, user_id, analytics.forecast, today)
+
 # Include router
 app.include_router(api_router)
 
+# Prometheus scrape endpoint, outside /api. Set METRICS_TOKEN to require it as a bearer token.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+metrics_registry.callback_gauge("response_cache_bytes", "Bytes held by the response cache.", lambda: response_cache.size)
+metrics_registry.callback_gauge("expense_cache_bytes", "Bytes held by the expense table cache.", lambda: expense_cache.size)
+metrics_registry.callback_gauge("auth_hash_pending", "Password hashes queued or running.", lambda: hash_pending)
+metrics_registry.callback_gauge("change_feed_streams", "Open /api/changes streams.", change_feed.total_connections)
+
+# Readiness probe for load balancers and orchestrators: 503 until startup (indexes, pool
+# warm-up) has finished and whenever MongoDB doesn't answer a ping. Indexes that couldn't
+# be created are listed in the body without failing the probe, which would take every
+# worker out of rotation at once.
+READY_PING_TIMEOUT_SECONDS = float(os.environ.get("READY_PING_TIMEOUT_SECONDS", "2"))
+worker_ready = False
+
+@app.get("/ready", include_in_schema=False)
+async def readiness():
+    if not worker_ready:
+        return PlainTextResponse("starting", status_code=503)
+    if index_task and not index_task.done():
+        return PlainTextResponse("creating indexes", status_code=503)
+    try:
+        await asyncio.wait_for(db.command("ping"), READY_PING_TIMEOUT_SECONDS)
+    except Exception:
+        return PlainTextResponse("database unavailable", status_code=503)
+    if missing_indexes:
+        return PlainTextResponse(f"ready; missing indexes: {', '.join(sorted(missing_indexes))}")
+    return PlainTextResponse("ready")
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: str = Header("")):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Dev-only: token endpoint (enabled via DEV_TOKEN_ENDPOINT env var)
 if os.environ.get("DEV_TOKEN_ENDPOINT", "false").lower() in ("1", "true", "yes"):
     @api_router.get("/dev/token")
@@ -577,7 +2682,7 @@ if os.environ.get("DEV_TOKEN_ENDPOINT", "false").lower() in ("1", "true", "yes")
                 "id": user_id,
                 "username": username,
                 "email": email,
-                "password_hash": get_password_hash(password),
+                "password_hash": await get_password_hash(password),
                 "currency": "USD",
                 "created_at": datetime.now(timezone.utc).isoformat(),
             }
@@ -623,7 +2728,10 @@ app.add_middleware(
     allow_origins=allow_origins_setting,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Added last so it wraps CORS and sees every response
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -631,6 +2739,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+scheduler_task: Optional[asyncio.Task] = None
+index_task: Optional[asyncio.Task] = None
+change_stream_task: Optional[asyncio.Task] = None
+export_job_tasks: List[asyncio.Task] = []
+
+async def start_worker():
+    global scheduler_task, index_task, change_stream_task, worker_ready
+    started = time.perf_counter()
+    connect_mongo()
+    try:
+        await ensure_indexes()
+    except PyMongoError as e:
+        # MongoDB is unreachable: start anyway and keep trying, so the worker can answer
+        # /ready with a 503 instead of failing to boot
+        logger.error(f"Could not create indexes, retrying in the background: {e}")
+        index_task = asyncio.create_task(retry_ensure_indexes())
+    try:
+        await warm_mongo_pool()
+    except Exception as e:
+        # Not fatal: /ready reports the database until it answers
+        logger.warning(f"MongoDB pool warm-up failed: {e}")
+    if RECURRING_SCHEDULER_ENABLED:
+        scheduler_task = asyncio.create_task(run_recurring_scheduler())
+    if CHANGE_FEED_SOURCE == "change_streams":
+        await enable_change_stream_pre_images()
+        change_stream_task = asyncio.create_task(run_change_stream())
+    export_job_tasks.extend(asyncio.create_task(run_export_worker()) for _ in range(EXPORT_JOB_WORKERS))
+    export_job_tasks.append(asyncio.create_task(run_export_sweeper()))
+    worker_ready = True
+    logger.info(
+        f"Worker ready: imported in {(IMPORT_FINISHED - IMPORT_STARTED) * 1000:.0f}ms, "
+        f"started in {(time.perf_counter() - started) * 1000:.0f}ms"
+    )
+
+async def stop_worker():
+    global worker_ready
+    worker_ready = False
+    if scheduler_task:
+        scheduler_task.cancel()
+    if index_task:
+        index_task.cancel()
+    if change_stream_task:
+        change_stream_task.cancel()
+    for task in export_job_tasks:
+        task.cancel()
+    client.close()
+    export_executor.shutdown(wait=False)
+    analytics_executor.shutdown(wait=False)
+    pdf_executor.shutdown(wait=False)
+    hash_executor.shutdown(wait=False)
+
+IMPORT_FINISHED = time.perf_counter()
@@ -0,0 +1,104 @@
+import { useEffect, useRef } from 'react';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// One /api/changes stream per tab, shared by every mounted page. It is read with fetch
+// rather than EventSource so the token travels in the Authorization header, not the URL.
+// Events look like { entity, op: 'upsert', doc }, { entity, op: 'delete', id },
+// { entity, op: 'invalidate' } (refetch that entity) or { op: 'reset' } (refetch all).
+const listeners = new Set();
+let controller = null;
+let closeTimer = null;
+let lastEventId = null;
+
+const sleep = (ms, signal) =>
+  new Promise((resolve) => {
+    const timer = setTimeout(resolve, ms);
+    signal.addEventListener('abort', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+  });
+
+async function readEvents(response, onRetry) {
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let id = null;
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('id: ')) id = line.slice(4);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+        else if (line.startsWith('retry: ')) onRetry(parseInt(line.slice(7), 10));
+      }
+      if (!data) continue; // heartbeat
+      if (id) lastEventId = id;
+      const event = JSON.parse(data);
+      if (event.op !== 'ready') listeners.forEach((listener) => listener(event));
+    }
+  }
+}
+
+async function connect(signal) {
+  let retry = 3000;
+  while (!signal.aborted) {
+    try {
+      const headers = { Authorization: `Bearer ${localStorage.getItem('token')}` };
+      // The server replays what was missed since this id, or sends a reset
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+      const response = await fetch(`${API}/changes`, { headers, signal });
+      if (response.status === 401) return;
+      if (response.ok) {
+        await readEvents(response, (ms) => { retry = ms; });
+      } else if (response.status === 429) {
+        // Other tabs already hold this user's streams; they keep working as before
+        await sleep(30000, signal);
+      }
+    } catch (error) {
+      // Network error or aborted; retried below unless aborted
+    }
+    await sleep(retry, signal);
+  }
+}
+
+export function useChangeFeed(onChange) {
+  const handler = useRef(onChange);
+  handler.current = onChange;
+
+  useEffect(() => {
+    const listener = (event) => handler.current(event);
+    listeners.add(listener);
+    clearTimeout(closeTimer);
+    if (!controller) {
+      controller = new AbortController();
+      connect(controller.signal);
+    }
+    return () => {
+      listeners.delete(listener);
+      // Kept open briefly so navigating between pages doesn't reconnect
+      closeTimer = setTimeout(() => {
+        if (listeners.size === 0 && controller) {
+          controller.abort();
+          controller = null;
+        }
+      }, 5000);
+    };
+  }, []);
+}
+
+// Applies an upsert or delete event to a list of documents keyed by id. An event can
+// trail the response to this tab's own write, so an older version is ignored.
+export function applyChange(list, event) {
+  if (event.op === 'delete') return list.filter((item) => item.id !== event.id);
+  const index = list.findIndex((item) => item.id === event.doc.id);
+  if (index < 0) return [...list, event.doc];
+  if ((list[index].version ?? 0) > (event.doc.version ?? 0)) return list;
+  return list.map((item, i) => (i === index ? event.doc : item));
+}
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -7,12 +7,13 @@ import { Label } from '../components/ui/label';
 import { Progress } from '../components/ui/progress';
 import { toast } from 'sonner';
 import { AlertCircle, TrendingUp } from 'lucide-react';
+import { useChangeFeed } from '../hooks/use-change-feed';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 const BudgetPage = ({ user }) => {
   const [budget, setBudget] = useState(null);
-  const [expenses, setExpenses] = useState([]);
+  const [status, setStatus] = useState(null);
   const [loading, setLoading] = useState(true);
   const [formData, setFormData] = useState({
     month: new Date().getMonth() + 1,
@@ -22,9 +23,32 @@ const BudgetPage = ({ user }) => {
 
   useEffect(() => {
     fetchBudget();
-    fetchExpenses();
   }, []);
 
+  useEffect(() => {
+    fetchStatus();
+  }, [formData.month, formData.year]);
+
+  const statusTimer = useRef(null);
+  useEffect(() => () => clearTimeout(statusTimer.current), []);
+
+  useChangeFeed((event) => {
+    if (event.op === 'reset') {
+      fetchBudget();
+    } else if (event.entity === 'budget' && event.op === 'upsert') {
+      // Keeps the loaded version current; the form keeps whatever is being typed
+      setBudget((prev) =>
+        prev && prev.month === event.doc.month && prev.year === event.doc.year ? event.doc : prev
+      );
+      return;
+    } else if (event.entity !== 'expense') {
+      return;
+    }
+    // Spending is summed server-side, so expense changes refresh the status (debounced)
+    clearTimeout(statusTimer.current);
+    statusTimer.current = setTimeout(fetchStatus, 1000);
+  });
+
   const fetchBudget = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -48,15 +72,16 @@ const BudgetPage = ({ user }) => {
     }
   };
 
-  const fetchExpenses = async () => {
+  const fetchStatus = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API}/expenses`, {
+      // Spending is summed server-side; no need to download the expense list
+      const response = await axios.get(`${API}/budget/${formData.month}/${formData.year}/status`, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      setExpenses(response.data);
+      setStatus(response.data);
     } catch (error) {
-      console.error('Failed to load expenses');
+      console.error('Failed to load budget status');
     }
   };
 
@@ -64,28 +89,24 @@ const BudgetPage = ({ user }) => {
     e.preventDefault();
     try {
       const token = localStorage.getItem('token');
-      await axios.post(`${API}/budget`, formData, {
+      // The loaded version only applies to the month it was loaded for
+      const loaded = budget && budget.month === formData.month && budget.year === formData.year;
+      const response = await axios.post(`${API}/budget`, { ...formData, version: loaded ? budget.version : undefined }, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      setBudget(response.data);
       toast.success('Budget updated successfully');
-      fetchBudget();
     } catch (error) {
-      toast.error('Failed to update budget');
+      if (error.response?.status === 409) {
+        toast.error('This budget was changed elsewhere. Reloaded the latest value.');
+        fetchBudget();
+      } else {
+        toast.error('Failed to update budget');
+      }
     }
   };
 
-  const calculateMonthlySpending = () => {
-    const currentMonth = formData.month;
-    const currentYear = formData.year;
-    return expenses
-      .filter((exp) => {
-        const expDate = new Date(exp.date);
-        return expDate.getMonth() + 1 === currentMonth && expDate.getFullYear() === currentYear;
-      })
-      .reduce((sum, exp) => sum + exp.amount, 0);
-  };
-
-  const monthlySpent = calculateMonthlySpending();
+  const monthlySpent = status?.spent || 0;
   const budgetLimit = parseFloat(formData.limit) || 0;
   const percentage = budgetLimit > 0 ? (monthlySpent / budgetLimit) * 100 : 0;
   const remaining = budgetLimit - monthlySpent;
@@ -217,6 +238,11 @@ const BudgetPage = ({ user }) => {
                 className="h-3"
                 data-testid="budget-progress-bar"
               />
+              {status?.days_elapsed > 0 && (
+                <p className="text-xs text-gray-500 dark:text-gray-400 mt-2" data-testid="daily-burn-rate">
+                  Spending {user?.currency} {status.daily_burn_rate.toFixed(2)} per day over {status.days_elapsed} of {status.days_in_period} days
+                </p>
+              )}
             </div>
 
             {isOverBudget && (
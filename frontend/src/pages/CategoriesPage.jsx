@@ -8,6 +8,7 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { toast } from 'sonner';
 import { Plus, Trash2 } from 'lucide-react';
 import * as Icons from 'lucide-react';
+import { useChangeFeed, applyChange } from '../hooks/use-change-feed';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -35,6 +36,14 @@ const CategoriesPage = () => {
     fetchCategories();
   }, []);
 
+  useChangeFeed((event) => {
+    if (event.op === 'reset' || (event.entity === 'category' && event.op === 'invalidate')) {
+      fetchCategories();
+    } else if (event.entity === 'category') {
+      setCategories((prev) => applyChange(prev, event));
+    }
+  });
+
   const fetchCategories = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -53,11 +62,11 @@ const CategoriesPage = () => {
     e.preventDefault();
     try {
       const token = localStorage.getItem('token');
-      await axios.post(`${API}/categories`, formData, {
+      const response = await axios.post(`${API}/categories`, formData, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      setCategories((prev) => applyChange(prev, { op: 'upsert', doc: response.data }));
       toast.success('Category added successfully');
-      fetchCategories();
       setDialogOpen(false);
       setFormData({ name: '', icon: 'Tag', color: '#FF6B6B' });
     } catch (error) {
@@ -76,8 +85,8 @@ const CategoriesPage = () => {
         await axios.delete(`${API}/categories/${id}`, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        setCategories((prev) => applyChange(prev, { op: 'delete', id }));
         toast.success('Category deleted successfully');
-        fetchCategories();
       } catch (error) {
         toast.error('Failed to delete category');
       }
@@ -1,9 +1,10 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { PieChart, Pie, BarChart, Bar, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Cell } from 'recharts';
 import { DollarSign, TrendingUp, CreditCard, Calendar } from 'lucide-react';
 import { toast } from 'sonner';
+import { useChangeFeed } from '../hooks/use-change-feed';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -13,10 +14,21 @@ const Dashboard = ({ user }) => {
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
 
+  const refreshTimer = useRef(null);
+
   useEffect(() => {
     fetchDashboardStats();
+    return () => clearTimeout(refreshTimer.current);
   }, []);
 
+  // The stats are aggregates, so they are refetched rather than patched, at most once
+  // per burst of expense changes
+  useChangeFeed((event) => {
+    if (event.entity !== 'expense' && event.op !== 'reset') return;
+    clearTimeout(refreshTimer.current);
+    refreshTimer.current = setTimeout(fetchDashboardStats, 1000);
+  });
+
   const fetchDashboardStats = async () => {
     try {
       const token = localStorage.getItem('token');
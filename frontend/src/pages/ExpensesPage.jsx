@@ -7,11 +7,14 @@ import { Label } from '../components/ui/label';
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from '../components/ui/dialog';
 import { toast } from 'sonner';
 import { Plus, Edit, Trash2, Mic, MicOff } from 'lucide-react';
+import { useChangeFeed, applyChange } from '../hooks/use-change-feed';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
 const ExpensesPage = ({ user }) => {
   const [expenses, setExpenses] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -30,19 +33,35 @@ const ExpensesPage = ({ user }) => {
     date_from: '',
     date_to: ''
   });
+  const [searchInput, setSearchInput] = useState('');
+  const [search, setSearch] = useState('');
 
   useEffect(() => {
-    fetchExpenses();
     fetchCategories();
   }, []);
 
-  const fetchExpenses = async () => {
+  useEffect(() => {
+    const timer = setTimeout(() => setSearch(searchInput.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchInput]);
+
+  useEffect(() => {
+    fetchExpenses();
+  }, [filters, search]);
+
+  // Filtering and ordering (newest first, or best match first for a search) happen on
+  // the server; each page carries the cursor for the next one in the X-Next-Cursor header
+  const fetchExpenses = async (cursor = null) => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API}/expenses`, {
-        headers: { Authorization: `Bearer ${token}` }
+      const params = search ? { q: search } : Object.fromEntries(Object.entries(filters).filter(([, v]) => v));
+      if (cursor) params.cursor = cursor;
+      const response = await axios.get(`${API}/expenses${search ? '/search' : ''}`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params
       });
-      setExpenses(response.data.sort((a, b) => new Date(b.date) - new Date(a.date)));
+      setExpenses((prev) => (cursor ? prev.concat(response.data) : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       toast.error('Failed to load expenses');
     } finally {
@@ -50,6 +69,50 @@ const ExpensesPage = ({ user }) => {
     }
   };
 
+  // Server order: newest date first, then id descending
+  const compareExpenses = (a, b) =>
+    a.date !== b.date ? (a.date < b.date ? 1 : -1) : a.id < b.id ? 1 : a.id > b.id ? -1 : 0;
+
+  const matchesFilters = (expense) =>
+    (!filters.category || expense.category === filters.category) &&
+    (!filters.payment_method || expense.payment_method === filters.payment_method) &&
+    (!filters.date_from || expense.date >= filters.date_from) &&
+    (!filters.date_to || expense.date <= filters.date_to);
+
+  // Patches the loaded list with one change, the same way the server would have listed it
+  const applyExpenseChange = (prev, event) => {
+    if (event.op === 'delete') return applyChange(prev, event);
+    const current = prev.find((expense) => expense.id === event.doc.id);
+    if (current && current.version > event.doc.version) return prev;
+    const known = Boolean(current);
+    // Search results are ranked by relevance, which only the server knows
+    if (search) return known ? applyChange(prev, event) : prev;
+    const rest = prev.filter((expense) => expense.id !== event.doc.id);
+    if (!matchesFilters(event.doc)) return rest;
+    // Rows past the loaded pages arrive with the next page instead
+    const last = rest[rest.length - 1];
+    if (!known && nextCursor && last && compareExpenses(event.doc, last) > 0) return rest;
+    return [...rest, event.doc].sort(compareExpenses);
+  };
+
+  // Changes from this and other tabs or devices are patched in instead of refetching
+  useChangeFeed((event) => {
+    if (event.op === 'reset' || (event.entity === 'expense' && event.op === 'invalidate')) {
+      fetchExpenses();
+    } else if (event.entity === 'expense') {
+      setExpenses((prev) => applyExpenseChange(prev, event));
+    } else if (event.entity === 'category' && event.op !== 'invalidate') {
+      setCategories((prev) => applyChange(prev, event));
+    }
+    if (event.op === 'reset') fetchCategories();
+  });
+
+  const loadMore = async () => {
+    setLoadingMore(true);
+    await fetchExpenses(nextCursor);
+    setLoadingMore(false);
+  };
+
   const fetchCategories = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -67,21 +130,30 @@ const ExpensesPage = ({ user }) => {
     try {
       const token = localStorage.getItem('token');
       if (editingExpense) {
-        await axios.put(`${API}/expenses/${editingExpense.id}`, formData, {
+        // Sending the loaded version makes the server reject the edit if another tab changed it first
+        const response = await axios.put(`${API}/expenses/${editingExpense.id}`, { ...formData, version: editingExpense.version }, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        setExpenses((prev) => applyExpenseChange(prev, { op: 'upsert', doc: response.data }));
         toast.success('Expense updated successfully');
       } else {
-        await axios.post(`${API}/expenses`, formData, {
+        const response = await axios.post(`${API}/expenses`, formData, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        setExpenses((prev) => applyExpenseChange(prev, { op: 'upsert', doc: response.data }));
         toast.success('Expense added successfully');
       }
-      fetchExpenses();
       setDialogOpen(false);
       resetForm();
     } catch (error) {
-      toast.error('Failed to save expense');
+      if (error.response?.status === 409) {
+        toast.error('This expense was changed elsewhere. Reloaded the latest version.');
+        fetchExpenses();
+        setDialogOpen(false);
+        resetForm();
+      } else {
+        toast.error('Failed to save expense');
+      }
     }
   };
 
@@ -92,8 +164,8 @@ const ExpensesPage = ({ user }) => {
         await axios.delete(`${API}/expenses/${id}`, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        setExpenses((prev) => applyChange(prev, { op: 'delete', id }));
         toast.success('Expense deleted successfully');
-        fetchExpenses();
       } catch (error) {
         toast.error('Failed to delete expense');
       }
@@ -158,14 +230,6 @@ const ExpensesPage = ({ user }) => {
     recognition.start();
   };
 
-  const filteredExpenses = expenses.filter((expense) => {
-    if (filters.category && expense.category !== filters.category) return false;
-    if (filters.payment_method && expense.payment_method !== filters.payment_method) return false;
-    if (filters.date_from && expense.date < filters.date_from) return false;
-    if (filters.date_to && expense.date > filters.date_to) return false;
-    return true;
-  });
-
   return (
     <div className="space-y-6" data-testid="expenses-page">
       <div className="flex flex-col sm:flex-row justify-between items-start sm:items-center gap-4">
@@ -286,6 +350,16 @@ const ExpensesPage = ({ user }) => {
       {/* Filters */}
       <Card className="glass border-0" data-testid="filters-card">
         <CardContent className="pt-6">
+          <div className="mb-4">
+            <Label>Search</Label>
+            <Input
+              className="mt-1"
+              placeholder="Search notes and categories"
+              value={searchInput}
+              onChange={(e) => setSearchInput(e.target.value)}
+              data-testid="expense-search-input"
+            />
+          </div>
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-4 gap-4">
             <div>
               <Label>Category</Label>
@@ -347,18 +421,18 @@ const ExpensesPage = ({ user }) => {
       {/* Expenses List */}
       <Card className="glass border-0" data-testid="expenses-list-card">
         <CardHeader>
-          <CardTitle>All Expenses ({filteredExpenses.length})</CardTitle>
+          <CardTitle>All Expenses ({expenses.length}{nextCursor ? '+' : ''})</CardTitle>
         </CardHeader>
         <CardContent>
           {loading ? (
             <div className="text-center py-8">
               <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-purple-600 mx-auto"></div>
             </div>
-          ) : filteredExpenses.length === 0 ? (
+          ) : expenses.length === 0 ? (
             <p className="text-center text-gray-500 dark:text-gray-400 py-8">No expenses found</p>
           ) : (
             <div className="space-y-3">
-              {filteredExpenses.map((expense) => (
+              {expenses.map((expense) => (
                 <div
                   key={expense.id}
                   className="flex flex-col sm:flex-row justify-between items-start sm:items-center p-4 bg-white/50 dark:bg-gray-700/50 rounded-lg hover:bg-white/70 dark:hover:bg-gray-700/70 transition-colors"
@@ -400,6 +474,18 @@ const ExpensesPage = ({ user }) => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="text-center pt-2">
+                  <Button
+                    variant="outline"
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    data-testid="load-more-expenses-button"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
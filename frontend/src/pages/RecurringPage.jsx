@@ -7,6 +7,7 @@ import { Label } from '../components/ui/label';
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from '../components/ui/dialog';
 import { toast } from 'sonner';
 import { Plus, Trash2, Calendar } from 'lucide-react';
+import { useChangeFeed, applyChange } from '../hooks/use-change-feed';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -29,6 +30,17 @@ const RecurringPage = ({ user }) => {
     fetchCategories();
   }, []);
 
+  useChangeFeed((event) => {
+    if (event.op === 'reset' || (event.entity === 'recurring' && event.op === 'invalidate')) {
+      fetchRecurring();
+    } else if (event.entity === 'recurring') {
+      setRecurring((prev) => applyChange(prev, event));
+    } else if (event.entity === 'category' && event.op !== 'invalidate') {
+      setCategories((prev) => applyChange(prev, event));
+    }
+    if (event.op === 'reset') fetchCategories();
+  });
+
   const fetchRecurring = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -59,11 +71,11 @@ const RecurringPage = ({ user }) => {
     e.preventDefault();
     try {
       const token = localStorage.getItem('token');
-      await axios.post(`${API}/recurring`, formData, {
+      const response = await axios.post(`${API}/recurring`, formData, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      setRecurring((prev) => applyChange(prev, { op: 'upsert', doc: response.data }));
       toast.success('Recurring expense added successfully');
-      fetchRecurring();
       setDialogOpen(false);
       setFormData({
         category: '',
@@ -85,8 +97,8 @@ const RecurringPage = ({ user }) => {
         await axios.delete(`${API}/recurring/${id}`, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        setRecurring((prev) => applyChange(prev, { op: 'delete', id }));
         toast.success('Recurring expense deleted successfully');
-        fetchRecurring();
       } catch (error) {
         toast.error('Failed to delete recurring expense');
       }
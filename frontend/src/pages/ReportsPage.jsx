@@ -4,17 +4,41 @@ import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card'
 import { Button } from '../components/ui/button';
 import { toast } from 'sonner';
 import { Download, FileText, FileSpreadsheet, File } from 'lucide-react';
+import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+const COLORS = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#fee140'];
+const INTERVALS = ['day', 'week', 'month', 'year'];
+
 const ReportsPage = ({ user }) => {
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [trendInterval, setTrendInterval] = useState('month');
+  const [splitByCategory, setSplitByCategory] = useState(false);
+  const [trend, setTrend] = useState(null);
 
   useEffect(() => {
     fetchStats();
   }, []);
 
+  useEffect(() => {
+    fetchTrend();
+  }, [trendInterval, splitByCategory]);
+
+  const fetchTrend = async () => {
+    try {
+      const token = localStorage.getItem('token');
+      const response = await axios.get(`${API}/reports/timeseries`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { interval: trendInterval, ...(splitByCategory ? { split_by: 'category' } : {}) }
+      });
+      setTrend(response.data);
+    } catch (error) {
+      toast.error('Failed to load spending trend');
+    }
+  };
+
   const fetchStats = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -102,6 +126,58 @@ const ReportsPage = ({ user }) => {
         </CardContent>
       </Card>
 
+      {/* Spending Trend */}
+      <Card className="glass border-0" data-testid="spending-trend-card">
+        <CardHeader className="flex flex-row items-center justify-between">
+          <CardTitle>Spending Trend</CardTitle>
+          <div className="flex items-center gap-3">
+            <label className="flex items-center gap-1 text-sm text-gray-600 dark:text-gray-300">
+              <input
+                type="checkbox"
+                data-testid="trend-split-toggle"
+                checked={splitByCategory}
+                onChange={(e) => setSplitByCategory(e.target.checked)}
+              />
+              By category
+            </label>
+            <select
+              data-testid="trend-interval-select"
+              className="px-3 py-1 border rounded-md bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100 border-gray-300 dark:border-gray-600"
+              value={trendInterval}
+              onChange={(e) => setTrendInterval(e.target.value)}
+            >
+              {INTERVALS.map((value) => (
+                <option key={value} value={value}>
+                  {value.charAt(0).toUpperCase() + value.slice(1)}
+                </option>
+              ))}
+            </select>
+          </div>
+        </CardHeader>
+        <CardContent>
+          {trend?.series?.some((point) => point.count > 0) ? (
+            <ResponsiveContainer width="100%" height={300}>
+              <BarChart data={trend.series.map((point) => ({ start: point.start, total: point.total, ...(point.by || {}) }))}>
+                <CartesianGrid strokeDasharray="3 3" />
+                <XAxis dataKey="start" />
+                <YAxis />
+                <Tooltip />
+                {splitByCategory ? (
+                  [...new Set(trend.series.flatMap((point) => Object.keys(point.by || {})))].map((category, index) => (
+                    <Bar key={category} dataKey={category} stackId="total" fill={COLORS[index % COLORS.length]} />
+                  ))
+                ) : (
+                  <Bar dataKey="total" fill="#667eea" />
+                )}
+                {splitByCategory && <Legend />}
+              </BarChart>
+            </ResponsiveContainer>
+          ) : (
+            <p className="text-center text-gray-500 py-20">No expense data available</p>
+          )}
+        </CardContent>
+      </Card>
+
       {/* Summary Stats */}
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4">
         <Card className="glass border-0" data-testid="report-total-expenses">